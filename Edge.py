@@ -43,6 +43,9 @@ class Edge(tuple):
 
         return self
 
+    def __getnewargs__(self):
+        return self.label, self.nodes, self.line
+
     @property
     def json(self):
         '''
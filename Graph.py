@@ -27,6 +27,7 @@ from collections import OrderedDict
 from util import *
 import reduce
 import op
+import tree as T
 from Edge import Edge
 from Line import Line
 
@@ -41,16 +42,25 @@ class Graph(tuple):
         self.edges = edges
         return self
 
+    def __getnewargs__(self):
+        return self.nodes, self.edges
+
     @classmethod
     def harvest(cls, tree):
-        '''*harvest* edges from the parse *tree*
+        '''*harvest* edges from the parse *tree* (a `Tree` or a `FlatTree`)
 
         memoization saves each subtree as it's reduced (whose leaves are by construction other reduced subtrees).
+        in a `tree.sharing` session, a subtree shared with the lines before is reduced once, for all of them.
         '''
-        f = memoize(reduce.reduce, cache=OrderedDict())
-        tree.fold(f)
-
-        graph = [(verb, nouns) for ((verb, nouns), _) in f.__cache__.items()]
+        if T.shared is not None and isinstance(tree, T.Tree):
+            reduced = OrderedDict()
+            T.shared.fold(tree, reduce.reduce, seen=lambda verb, nouns, noun: reduced.setdefault((verb, nouns), noun))
+        else:
+            f = memoize(reduce.reduce, cache=OrderedDict())
+            tree.fold(f)
+            reduced = f.__cache__
+
+        graph = [(verb, nouns) for ((verb, nouns), _) in reduced.items()]
 
         verbs = [(verb, nouns) for (verb, nouns) in graph if isinstance(verb, op.Op)]
 
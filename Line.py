@@ -1,14 +1,26 @@
 '''
 '''
+import sys
+
 
 class Line(str):
+    '''a line of text, and where it's from.
+
+    a `str` subclass can't have (non-empty) `__slots__`,
+    so a `Line` keeps a small instance dict of just `file` and `lineno`:
+    `text` is the line itself (not a second copy),
+    and `file` is interned (shared by every line of the file).
+    '''
     def __new__(cls, text: str = '', file: str = '', lineno: int = 0):
         self = super().__new__(cls, text)
-        self.text = text
-        self.file = file
+        self.file = sys.intern(file)
         self.lineno = lineno
         return self
 
+    @property
+    def text(self) -> str:
+        return str.__str__(self)
+
     def __repr__(self):
         string = super().__str__()
         if not self.file:
@@ -16,28 +28,45 @@ class Line(str):
         else:
             return 'Line(%r, file=%r, lineno=%r)' % (string, self.file, self.lineno)
 
-    def __getattribute__(self, attr):
-        '''transparently return a Line for any str method call that returns a str.
+    # the str methods the parser calls return a Line (at the same place).
+    # others return a plain str.
 
-        >>> Line('Line', 'file.txt', 0).strip()
+    def strip(self, chars=None):
+        '''
+        >>> Line(' Line ', 'file.txt', 0).strip()
         Line('Line', file='file.txt', lineno=0)
         >>> isinstance(Line('Line').split(), list)
         True
         '''
+        return self.like(str.strip(self, chars))
 
-        attr = super().__getattribute__(attr)
-        if hasattr(attr, '__call__') and not str(attr).startswith('__'):
+    def lstrip(self, chars=None):
+        return self.like(str.lstrip(self, chars))
 
-            def unstring(*args, **kwargs):
-                ret = attr(*args, **kwargs)
-                if isinstance(ret, str):
-                    return Line(ret, lineno=self.lineno, file=self.file)
-                else:
-                    return ret
-            return unstring
+    def rstrip(self, chars=None):
+        return self.like(str.rstrip(self, chars))
 
-        else:
-            return attr
+    def replace(self, old, new, count=-1):
+        '''
+        >>> Line('50%', lineno=3).replace('%', '%%')
+        Line('50%%', lineno=3)
+        '''
+        return self.like(str.replace(self, old, new, count))
+
+    def like(self, string: str) -> 'Line':
+        '''`string`, at this line's place (e.g. this line itself, when unchanged).
+        '''
+        if string == self: return self
+        return Line(string, self.file, self.lineno)
+
+    def __reduce__(self):
+        '''pickles by text, file, and lineno.
+
+        >>> import pickle
+        >>> pickle.loads(pickle.dumps(Line('Line', 'file.txt', 1)))
+        Line('Line', file='file.txt', lineno=1)
+        '''
+        return (Line, (self.text, self.file, self.lineno))
 
     @property
     def json(self):
@@ -0,0 +1,478 @@
+'''
+benchmarks of the hot paths, before and after their optimizations.
+
+    $ python benchmarks.py            # runs every benchmark
+    $ python benchmarks.py tokens     # runs some
+
+'''
+import sys
+import time
+import glob
+import os
+import subprocess
+import tracemalloc
+
+from util import *
+
+
+benchmarks = {}
+@decorator
+def benchmark(f):
+    '''decorated by `benchmark` means:
+
+    * it's run by name, by `python benchmarks.py name`
+    * it prints its measurements
+    '''
+    benchmarks[f.__name__] = f
+    return f
+
+def timed(f, *args, repeat=3, **kwargs) -> float:
+    '''the best time (in seconds) of a few calls.
+    '''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def report(name, n, seconds, unit):
+    print('    %-40s %12.0f %s/sec' % (name, n / seconds, unit))
+
+def corpus_files():
+    return ['test/example.note'] + sorted(glob.glob('static/notes/*.note'))
+
+def corpus_text():
+    return '\n\n'.join(open(file).read() for file in corpus_files())
+
+def corpus_words():
+    '''the words of the notes (and of the drugs data), like `tokens.tokenize` sees them.
+    '''
+    words = corpus_text().split()
+    words += open('static/notes/drugs.json').read().split()
+    return words
+
+@benchmark
+def tokens():
+    import tokens
+
+    words = corpus_words()
+
+    def classify(match):
+        for word in words:
+            match(word)
+
+    report('tokens.match_tokens (one regex at a time)', len(words), timed(classify, tokens.match_tokens), 'words')
+    report('tokens.match_word (one combined regex)', len(words), timed(classify, tokens.match_word), 'words')
+
+@benchmark
+def vocabulary():
+    '''tokenizing the lines of the notes (and of the drugs data), by matching each word vs through `tokens.vocabulary`.
+    '''
+    import tempfile
+    import cache
+    import config
+    import tokens
+
+    lines = corpus_text().splitlines() + open('static/notes/drugs.json').read().splitlines()
+    words = [word for line in lines for word in line.split()]
+    print('    %-40s %12d words, %d distinct' % ('corpus', len(words), len(set(words))))
+
+    def match_all():
+        return [tokens.Words(*map(tokens.match_word, line.split())) for line in lines]
+
+    def tokenize_all():
+        return [tokens.tokenize(line) for line in lines]
+
+    def stats(name, seconds):
+        report(name, len(words), seconds, 'words')
+        print('    %-40s %12.2f hit rate' % ('', tokens.vocabulary.hit_rate))
+
+    memory = tokens.vocabulary
+    try:
+        report('tokens.match_word (each word)', len(words), timed(match_all), 'words')
+
+        tokens.vocabulary = cache.Cache(size=config.vocabulary['size'], version=config.tokens_hash)
+        stats('tokens.tokenize (cold vocabulary)', timed(tokenize_all, repeat=1))
+        stats('tokens.tokenize (warm vocabulary)', timed(tokenize_all))
+
+        tokens.vocabulary = cache.Cache(size=config.vocabulary['size'], version=config.tokens_hash)
+        stats('tokens.ingest (cold vocabulary)', timed(tokens.ingest, lines, repeat=1))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'vocabulary')
+            tokens.vocabulary = cache.Cache(size=config.vocabulary['size'], path=path, version=config.tokens_hash)
+            tokens.ingest(lines)
+            tokens.vocabulary.close()
+
+            tokens.vocabulary = cache.Cache(size=config.vocabulary['size'], path=path, version=config.tokens_hash)
+            stats('tokens.ingest (vocabulary on disk)', timed(tokens.ingest, lines, repeat=1))
+            tokens.vocabulary.close()
+    finally:
+        tokens.vocabulary = memory
+
+@benchmark
+def lines():
+    import notes
+
+    text = corpus_text() * 10
+    n = text.count('\n') + 1
+
+    def read():
+        return list(notes.read(text, file='benchmark.note'))
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    read_notes = read()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    lines = sum(1 for note in read_notes for _ in note)
+
+    print('    %-40s %12.0f bytes/line' % ('notes.read (held notes)', (after - before) / lines))
+    report('notes.read', n, timed(read), 'lines')
+
+def long_line(n: int) -> str:
+    """a line of `n` spaced clauses, each with a few unspaced operators."""
+    return '   ,   '.join('x%d -> y%d + z%d, w%d' % (i, i, i, i) for i in range(n))
+
+@benchmark
+def cst():
+    import parsing
+
+    for n in [10, 50]:
+        line = long_line(n)
+        cst = parsing.CST(line)
+        report('parsing.CST (%d clauses)' % n, len(line), timed(parsing.CST, line), 'chars')
+        report('parsing.AST (%d clauses)' % n, len(line), timed(parsing.AST, cst), 'chars')
+        report('parsing.unparse (%d clauses)' % n, len(line), timed(parsing.unparse, cst), 'chars')
+
+@benchmark
+def trees():
+    '''`AST` and `harvest` of a big line, over nested tuples (`Tree`) and over arrays (`FlatTree`).
+    '''
+    import gc
+    import parsing
+    import Graph
+    from tree import FlatTree
+
+    def ast_and_harvest(cst):
+        return Graph.Graph.harvest(parsing.AST(cst))
+
+    for n in [10, 50]:
+        cst = parsing.CST(long_line(n))
+        for tree in [cst, FlatTree(cst)]:
+            collections = sum(stat['collections'] for stat in gc.get_stats())
+            seconds = timed(ast_and_harvest, tree)
+            collections = sum(stat['collections'] for stat in gc.get_stats()) - collections
+            name = 'AST + harvest, %s (%d clauses)' % (type(tree).__name__, n)
+            print('    %-40s %12.0f nodes/sec %6d collections' % (name, len(tree.preorder()) / seconds, collections))
+
+@benchmark
+def spans():
+    '''the memory held by a CST (as a `Tree`, and as spans of its line), and `unparse` of each.
+    '''
+    import parsing
+
+    for n in [10, 50]:
+        line = long_line(n)
+        cst = parsing.CST(line)
+
+        for make in [lambda: parsing.Source(line, cst).tree(), lambda: parsing.Source(line, cst)]:
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            tree = make()
+            after = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            name = '%s (%d clauses)' % (type(tree).__name__, n)
+            print('    %-40s %12.0f bytes/char' % (name, (after - before) / len(line)))
+            report('parsing.unparse, ' + name, len(line), timed(parsing.unparse, tree), 'chars')
+
+@benchmark
+def harvest():
+    '''`harvest` of the ASTs of the example notes (which hashes an operator per subtree).
+    '''
+    import parsing
+    import Graph
+
+    lines = [line for line in corpus_text().splitlines() if line.strip()]
+    asts = [parsing.AST(parsing.CST(line)) for line in lines]
+    nodes = sum(len(ast.preorder()) for ast in asts)
+
+    def harvest_all():
+        for ast in asts:
+            Graph.Graph.harvest(ast)
+
+    report('Graph.harvest', nodes, timed(harvest_all), 'nodes')
+
+@benchmark
+def ternops():
+    '''ternary operators on pathological lines: full of the left symbol, without the right one.
+    (the time per character should stay flat.)
+    '''
+    import parsing
+    import syntax
+
+    where = syntax.whiten(syntax.operators['< where'][0], 1)
+    for n in [1000, 10000, 100000]:
+        line = ('x < ' * n)[:n]
+        report('parsing.parse_ternop (%d chars)' % n, n, timed(parsing.parse_ternop, where, line), 'chars')
+
+def table_line(gap: int) -> str:
+    """a column-aligned line (like a row of a table-like note), with a `gap`-space gap."""
+    return 'aspirin' + ' ' * gap + '->  headache , fever  :  symptom'
+
+@benchmark
+def spacing():
+    '''passes (and time) of `CST` on column-aligned lines vs on prose.
+    '''
+    import parsing
+    import syntax
+
+    for line in ['aspirin -> headache , fever : symptom', table_line(10), table_line(40)]:
+        passes = len(parsing.get_operators(syntax.precedence, line))
+        name = 'parsing.CST (%d spaces, %d passes)' % (parsing.get_max_spaces(line), passes)
+        report(name, 1, timed(parsing.CST, line), 'lines')
+
+@benchmark
+def passes():
+    '''passes of `CST` per line of the example notes, over every operator vs over the operators that occur.
+    '''
+    import parsing
+    import syntax
+
+    lines = [line for line in corpus_text().splitlines() if line.strip()]
+    every = sum(1 for line in lines for n in parsing.get_spacing(line) for op in syntax.precedence if n in op.spacing)
+    occurring = sum(len(parsing.get_operators(syntax.precedence, line)) for line in lines)
+
+    def parse_all():
+        for line in lines:
+            parsing.CST(line)
+
+    print('    %-40s %12.1f passes/line' % ('every operator', every / len(lines)))
+    print('    %-40s %12.1f passes/line' % ('the operators in the line', occurring / len(lines)))
+    report('parsing.CST', len(lines), timed(parse_all), 'lines')
+
+@benchmark
+def tokenize():
+    '''`tokens.tokenize` calls (and time) of `CST` per line of the example notes,
+    with the leaves' tokens memoized per line (see `parsing.has_tokens`) vs re-tokenized by each 0-space pass.
+    '''
+    import parsing
+    import tokens
+
+    lines = [line for line in corpus_text().splitlines() if line.strip()]
+
+    def parse_all():
+        for line in lines:
+            parsing.CST(line)
+
+    def counted(f):
+        def count(*args):
+            count.calls += 1
+            return f(*args)
+        count.calls = 0
+        return count
+
+    memoized, tokenize = parsing.has_tokens, tokens.tokenize
+    for name, has_tokens in [('re-tokenized', lambda leaf, tokenized: tokens.has_tokens(leaf)), ('memoized', memoized)]:
+        parsing.has_tokens, tokens.tokenize = has_tokens, counted(tokenize)
+        try:
+            parse_all()
+            print('    %-40s %12.1f calls/line' % ('tokens.tokenize, ' + name, tokens.tokenize.calls / len(lines)))
+            report('parsing.CST, ' + name, len(lines), timed(parse_all), 'lines')
+        finally:
+            parsing.has_tokens, tokens.tokenize = memoized, tokenize
+
+def chain(n: int) -> 'Tree':
+    """the CST of a chain `x0 -> x1 -> ...` of `n` operands (built directly, not parsed)."""
+    import syntax
+    import parsing
+    from tree import Tree
+
+    words = [parsing.Operand('x0')]
+    for i in range(1, n):
+        words += [parsing.Operator(' -> '), parsing.Operand('x%d' % i)]
+    return Tree((syntax.whiten(syntax.operators['->'][0], 1), words))
+
+@benchmark
+def chains():
+    '''association, `AST` and `harvest` of ever longer chains (their rates should stay flat).
+    '''
+    import parsing
+    import Graph
+
+    for n in [1000, 10000, 100000]:
+        cst = chain(n)
+        ast = parsing.AST(cst)
+        report('parsing.left_associate (%d operands)' % n, n, timed(parsing.left_associate, cst, repeat=1), 'operands')
+        report('parsing.AST (%d operands)' % n, n, timed(parsing.AST, cst, repeat=1), 'operands')
+        report('Graph.harvest (%d operands)' % n, n, timed(Graph.Graph.harvest, ast, repeat=1), 'operands')
+
+@benchmark
+def parse():
+    '''`parse.parse` of the notes, uncached, in this process's mode.
+    (the notes are repeated, so that each of the repetitions takes a second or so.)
+    '''
+    import parse
+    import cache
+
+    cache.parses = cache.Cache()  # i.e. nothing cached
+    text = corpus_text()
+
+    def parse_all():
+        return [parsed.graph for parsed in parse.parse(text)] # parses are lazy
+
+    copies = 1 + int(1 / timed(parse_all, repeat=1))
+    text = '\n\n'.join([text] * copies)
+    n = len(parse_all())
+
+    report('parse.parse (%s mode)' % mode, n, timed(parse_all, repeat=7), 'lines')
+
+@benchmark
+def bodies():
+    '''`parse.body` of default-context notes ("head" then "= body" lines),
+    re-parsing the head in each body line vs parsing it once per note.
+    '''
+    import parse
+    import cache
+    import context
+    from Line import Line
+
+    for words, lines in [(1, 10), (10, 10), (10, 500), (50, 500)]:
+        head = parse.head(Line(' '.join('head%d' % i for i in range(words))))
+        body = [Line('= body%d , alias%d' % (i, i)) for i in range(lines)]
+
+        def reparse_all():
+            for line in body:
+                holes = context.get('default', head.head, line)
+                parse.default(Line(holes % line)).graph # parses are lazy
+
+        def parse_all():
+            parse.head_trees = cache.Cache(size=parse.head_trees.size)  # i.e. the head parsed once per note
+            for line in body:
+                parse.body(head, line).graph
+
+        cache.parses = cache.Cache()  # i.e. nothing cached
+        name = '(%d-word head, %d body lines)' % (words, lines)
+        report('parse.body, each line whole ' + name, lines, timed(reparse_all), 'lines')
+        report('parse.body, after the head ' + name, lines, timed(parse_all), 'lines')
+
+@benchmark
+def items():
+    '''`parse.note` of an ellipsis note of 10k items (a tenth of them with operators of their own),
+    parsing each item in its context vs filling it into the head's template.
+    '''
+    import parse
+    import cache
+    import notes
+
+    items = ['item%d , alias%d' % (i, i) if i % 10 == 0 else 'item %d' % i for i in range(10000)]
+    note, = notes.read('\n'.join(['... -> + ACh'] + items))
+
+    def parse_note():
+        parse.templates = cache.Cache(size=parse.templates.size)  # i.e. compiled once per note
+        return [parsed.graph for parsed in parse.note(note, lines=True)]
+
+    cache.parses = cache.Cache()  # i.e. nothing cached
+    fill = parse.fill
+    try:
+        parse.fill = lambda template, item: None
+        report('parse.note, each item parsed', len(items), timed(parse_note, repeat=1), 'items')
+    finally:
+        parse.fill = fill
+    report('parse.note, items filled in', len(items), timed(parse_note, repeat=1), 'items')
+
+@benchmark
+def held():
+    '''the memory held by the parses of the notes (e.g. by a long-running server), with their trees vs dropped (see `parse.Parsed.drop`).
+    '''
+    import parse
+    import cache
+
+    text = corpus_text() * 10
+
+    for name, drop in [('with trees', False), ('trees dropped', True)]:
+        cache.parses = cache.Cache()  # i.e. held only by the list
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        lines = []
+        for parsed in parse.parse(text):
+            parsed.graph # parses are lazy, so their trees are made (then held or dropped)
+            lines.append(parsed.drop() if drop else parsed)
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print('    %-40s %12.0f bytes/line' % ('parse.parse, ' + name, (after - before) / len(lines)))
+
+def tree_bytes(trees) -> (int, int):
+    '''the (number, bytes) of the distinct `Tree`s (i.e. by identity) in the trees.
+    '''
+    sizes = {}
+    stack = list(trees)
+    while stack:
+        tree = stack.pop()
+        if id(tree) not in sizes:
+            sizes[id(tree)] = sys.getsizeof(tree) + sys.getsizeof(tree[1])
+            stack.extend(tree[1])
+    return len(sizes), sum(sizes.values())
+
+@benchmark
+def shared():
+    '''the ASTs of a corpus-wide parse, as separate trees vs sharing their equal subtrees (see `tree.Share`).
+    '''
+    import parse
+    import cache
+    import config
+
+    text = corpus_text()
+    configured = config.cache['share']
+
+    for name, share in [('separate', False), ('shared', True)]:
+        config.cache['share'] = share
+        cache.parses = cache.Cache()  # i.e. each line parsed
+        parse.head_trees = cache.Cache()
+        parse.templates = cache.Cache()
+        start = time.perf_counter()
+        lines = []
+        for parsed in parse.parse(text):
+            parsed.graph # parses are lazy, so their trees are made within the session
+            if parsed.parser == 'default':
+                lines.append(parsed)
+        seconds = time.perf_counter() - start
+        trees, size = tree_bytes(parsed.ast for parsed in lines)
+        print('    %-40s %8d trees %8d bytes %10.0f lines/sec' % ('parse.parse, ' + name, trees, size, len(lines) / seconds))
+    config.cache['share'] = configured
+
+@benchmark
+def compiled():
+    '''parsing the lines of the notes, by interpreting the grammar vs with it compiled (see `codegen`).
+    '''
+    import codegen
+    import parsing
+
+    compiled = codegen.module(codegen.generate())
+    lines = [line for line in corpus_text().splitlines() if line.strip()] * 10
+
+    def parse_all(engine):
+        for line in lines:
+            engine(line)
+
+    report('parsing.recursive_regex (interpreted)', len(lines), timed(parse_all, parsing.recursive_regex), 'lines')
+    report('parsing.recursive_regex (compiled)', len(lines), timed(parse_all, compiled.recursive_regex), 'lines')
+
+@benchmark
+def modes():
+    '''the `parse` benchmark, in each mode (which is chosen at startup, so in a new process each).
+    '''
+    for mode in ['development', 'production']:
+        environment = dict(os.environ, NOTES_MODE=mode)
+        output = subprocess.check_output([sys.executable, __file__, 'parse'], env=environment, universal_newlines=True)
+        print(output.splitlines()[1])
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(benchmarks)
+    for name in names:
+        print(name)
+        benchmarks[name]()
+        print()
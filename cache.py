@@ -0,0 +1,170 @@
+'''
+a parse cache, content-addressed by (line, parser, head context, grammar).
+
+use `cache.parses` (configured in `cache.yaml`)
+
+two tiers:
+
+    memory  ~ a bounded LRU, of the most recently used parses
+    disk    ~ an optional shelf, that survives runs (e.g. CLI runs, server restarts)
+
+the grammar (`config.grammar_hash`) is part of every key,
+and the disk tier is cleared when it was written by another grammar.
+(a `Cache` of something else, like `tokens.vocabulary`, is versioned by its own hash.)
+
+'''
+from collections import OrderedDict
+from collections import namedtuple
+import hashlib
+import shelve
+import atexit
+
+from util import *
+import config
+from Line import Line
+
+
+Parse = namedtuple('Parse', 'text parsed is_head')
+# what's cached of a `Parsed`, without the `Line` of any one occurrence.
+# `is_head` means the head was the line itself (e.g. comments).
+
+def key(text: str, parser: str, context=None) -> tuple:
+    '''
+    >>> key('x -> y', 'default') == key(Line('x -> y', lineno=7), 'default')
+    True
+    '''
+    return (str(text), parser, context, config.grammar_hash)
+
+def address(key: tuple) -> str:
+    '''the content address of a key (for the disk tier).
+    '''
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+def pack(parsed: 'Parsed') -> Parse:
+    is_head = parsed.head is parsed.line
+    head = None if is_head else parsed.head
+    packed = parsed._replace(line=None, head=head)
+    if not config.cache['trees']: packed.drop()
+    return Parse(parsed.line.text, packed, is_head)
+
+def unpack(parse: Parse, lineno=0, file='') -> 'Parsed':
+    '''the cached parse, at this occurrence's line.
+    '''
+    text, parsed, is_head = parse
+    line = Line(text, lineno=lineno, file=file)
+    head = line if is_head else parsed.head
+    return parsed._replace(line=line, head=head)
+
+class Cache:
+    '''
+
+    >>> cache = Cache(size=2)
+    >>> cache.put('a', 1)
+    >>> cache.put('b', 2)
+    >>> cache.get('a')
+    1
+    >>> cache.put('c', 3)
+    >>> cache.get('b')
+    >>> pp(cache.stats)
+    {'disk_hits': 0, 'evictions': 1, 'hits': 1, 'misses': 1, 'size': 2}
+
+    '''
+    def __init__(self, size=0, path=None, version=None):
+        self.size = size
+        self.version = version or config.grammar_hash
+        self.memory = OrderedDict()
+        self.disk = shelve.open(path) if path else None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+        if self.disk is not None:
+            if self.disk.get('grammar') != self.version:
+                self.disk.clear()
+                self.disk['grammar'] = self.version
+            atexit.register(self.close)
+            opened.append(self)
+
+    def get(self, key):
+        '''returns the value, or None on a miss
+        '''
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+
+        if self.disk is not None:
+            value = self.disk.get(address(key))
+            if value is not None:
+                self.remember(key, value)
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+
+    def put(self, key, value):
+        self.remember(key, value)
+        if self.disk is not None:
+            self.disk[address(key)] = value
+
+    def remember(self, key, value):
+        '''puts in the memory tier, evicting the least recently used.
+        '''
+        if not self.size: return
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.size:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+            self.disk['grammar'] = self.version
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+    @property
+    def stats(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_hits': self.disk_hits,
+                'size': len(self.memory)}
+
+    @property
+    def hit_rate(self) -> float:
+        '''
+        >>> cache = Cache(size=1)
+        >>> cache.put('a', 1)
+        >>> cache.get('a'), cache.get('b')
+        (1, None)
+        >>> cache.hit_rate
+        0.5
+        '''
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+#:: [Cache]
+opened = []
+# the caches with a disk tier
+
+parses = Cache(size=config.cache['size'], path=config.cache['path'])
+
+def detach():
+    '''in a (forked) worker process, leaves the disk tiers to the parent process.
+    '''
+    for cache in opened:
+        cache.disk = None
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,258 @@
+'''
+compiles the grammar (`syntax.yaml`, `operators.yaml`) into a parser, i.e. a generated python module.
+
+`python command_line.py --build` writes it to `compiled_grammar.py`.
+`parsing` loads it (see `load`), if it was built from the current grammar, else it interprets the grammar, as before.
+
+the generated module has:
+
+    recursive_regex ~ the `recursive_regex` engine, with a fixed schedule of passes (each spacing, then each operator)
+    split_*         ~ a function per (whitened) operator, splitting a leaf with the operator's symbols
+
+a line with more spaces than `syntax.precompiled_spaces` is left to the interpreter.
+
+`parity` checks the generated parser against the interpreted one.
+
+'''
+import types
+import importlib
+
+from util import *
+from op import Op, Unop, Ternop
+from tree import FlatTree
+import config
+import syntax
+
+
+#:: int
+version = 3
+# of the generated code (a module built by another version isn't loaded)
+
+#:: str
+module_name = 'compiled_grammar'
+path = module_name + '.py'
+
+#:: int
+spaces = syntax.precompiled_spaces
+# the most spaces that the passes are generated for
+
+header = """'''
+the grammar, compiled into a parser (see `codegen.py`).
+
+generated from syntax.yaml and operators.yaml, don't edit.
+rebuild with `python command_line.py --build`.
+'''
+import config
+import codegen
+
+grammar_hash = {grammar_hash!r}
+version = {version!r}
+if (grammar_hash, version) != (config.grammar_hash, codegen.version):
+    # checked before anything is built from the grammar (which may have changed since)
+    raise ImportError('compiled_grammar.py was built from another grammar, rebuild it with `python command_line.py --build`')
+
+from tree import Tree
+from parsing import Operator, Operand, get_max_spaces, scan
+import parsing
+import syntax
+
+P = syntax.precedence
+nulop = syntax.nulop
+
+def Leaf(word):
+    return tuple.__new__(Tree, (word, ()))
+
+def Node(operator, words):
+    return tuple.__new__(Tree, (operator, tuple(Leaf(word) for word in words)))
+
+def grow(tree, split, marks, tokenized):
+    '''one pass over the leaves of the tree (see `parsing.parse_op`),
+    `marks` meaning the 0-space operators' marking of tokens as operands.
+    '''
+    word, trees = tree
+    if trees:
+        return tuple.__new__(Tree, (word, tuple(grow(tree, split, marks, tokenized) for tree in trees)))
+    if not word or isinstance(word, (Operand, Operator)):
+        return tree
+    if marks and parsing.has_tokens(word, tokenized): # looked up on each call, e.g. as swapped by a benchmark
+        return Leaf(Operand(word))
+    return split(word)
+
+def split_nulop(line):
+    return Leaf(line)
+"""
+
+def index(operator: Op) -> int:
+    '''the operator's position in `syntax.precedence` (by identity, as the definitions of a symbol may be equal).
+    '''
+    return next(i for i, _ in enumerate(syntax.precedence) if _ is operator)
+
+def name(operator: Op, n: int) -> str:
+    '''the name of an operator's split function (and of its constants), at `n` spaces.
+    '''
+    return '%d_%d' % (index(operator), n)
+
+def whitened(operator: Op, n: int) -> Op:
+    return syntax.whiten(operator, n)
+
+def split(operator: Op, n: int) -> [str]:
+    '''the split function of an operator at `n` spaces (like `parsing.parse_binop` or `parsing.parse_ternop`, for this one operator).
+    '''
+    op = whitened(operator, n)
+    suffix = name(operator, n)
+    lines = ['',
+             'W%s = syntax.whiten(P[%d], %d)' % (suffix, index(operator), n),
+             'def split_%s(line):' % suffix,
+             '    %s' % repr(repr(op))]
+
+    if isa(op, Ternop):
+        l, r = op
+        lines += ["    if '\\n' in line:",
+                  '        return parsing.parse_ternop(W%s, line)' % suffix,
+                  '    j = line.rfind(%r)' % r,
+                  '    if j < 0: return Leaf(line)',
+                  '    i = line.rfind(%r, 0, j)' % l,
+                  '    if i < 0: return Leaf(line)',
+                  '    words = [line[:i], %r, line[i + %d:j], %r, line[j + %d:]]' % (l, len(l), r, len(r)),
+                  '    words = [Operator(word) if word == %r or word == %r else word for word in words]' % (l, r),
+                  '    return Node(W%s, words)' % suffix]
+        return lines
+
+    if len(op) == 1:
+        symbol, = op
+        # `str.split` splits like the operator's regex, a group of one (escaped) symbol
+        lines += ['    if %r not in line: return Leaf(line)' % symbol,
+                  '    parts = line.split(%r)' % symbol,
+                  '    words = [parts[0]]',
+                  '    for part in parts[1:]:',
+                  '        words.append(O%s)' % suffix,
+                  '        words.append(part)']
+        lines.insert(1, 'O%s = Operator(%r)' % (suffix, symbol))
+    else:
+        lines += ['    words = W%s.pattern.split(line)' % suffix,
+                  '    words = [Operator(word) if word in W%s else word for word in words]' % suffix]
+
+    lines += ['    words = [word for word in words if word.strip()]']
+    if isa(op, Unop):
+        lines += ['    if len(words) == 2: return Node(W%s, words)' % suffix]
+    else:
+        lines += ['    if len(words) >= 3: return Node(W%s, words)' % suffix]
+    lines += ['    return Leaf(line)']
+    return lines
+
+def occurs(operator: Op) -> str:
+    '''`parsing.occurs`, as an expression of `line`.
+    '''
+    conjunction = ' and ' if isa(operator, Ternop) else ' or '
+    return '(%s)' % conjunction.join('%r in line' % symbol for symbol in operator)
+
+def schedule() -> [str]:
+    '''the body of the `recursive_regex` engine: the passes of `parsing.get_operators`, unrolled.
+    '''
+    import parsing
+
+    table = parsing.get_symbol_table(syntax.precedence)
+    lines = ['',
+             'def recursive_regex(line):',
+             "    '''`parsing.recursive_regex`, with the passes fixed (see `parsing.get_operators`).",
+             "    '''",
+             '    levels = scan(P, line)',
+             '    top = get_max_spaces(line)']
+    if table.bounded:
+        lines += ['    top = min(top, max(levels.values()) if levels else 0)']
+    lines += ['    if top > %d:' % spaces,
+              '        return parsing.recursive_regex(line)',
+              '',
+              '    tree = Leaf(line)',
+              '    tokenized = {}']
+
+    for n in reversed(range(1 + spaces)):
+        operators = [operator for operator in syntax.precedence if n in operator.spacing]
+        if not operators: continue
+
+        lines += ['']
+        if n:
+            lines += ['    if top >= %d:' % n]
+        indent = '        ' if n else '    '
+
+        for k, operator in enumerate(operators):
+            op = whitened(operator, n)
+            grow = 'tree = grow(tree, split_%s, %s, tokenized)' % (name(operator, n), not op.spaces)
+            if not n:
+                condition = occurs(op)
+            elif operator in table.climbable:
+                condition = 'levels.get(P[%d], 0) >= %d' % (index(operator), n)
+            else:
+                condition = occurs(op)
+            lines += [indent + 'if %s: %s' % (condition, grow)]
+
+            if not n and k == len(operators) - 1:
+                # the nulop only marks tokens, when the last 0-space operator is skipped
+                lines += [indent + 'else: tree = grow(tree, split_nulop, True, tokenized)']
+
+    lines += ['',
+              '    return tree']
+    return lines
+
+def generate() -> str:
+    '''the source of the compiled grammar.
+    '''
+    lines = [header.format(grammar_hash=config.grammar_hash, version=version)]
+    for operator in syntax.precedence:
+        for n in range(1 + spaces):
+            if n in operator.spacing:
+                lines += split(operator, n)
+    lines += schedule()
+    return '\n'.join(lines) + '\n'
+
+def build(path=path) -> str:
+    '''writes the compiled grammar.
+    '''
+    with open(path, 'w') as file:
+        file.write(generate())
+    return path
+
+def module(source: str) -> types.ModuleType:
+    '''the compiled grammar, from its source (e.g. to check it before it's built).
+    '''
+    compiled = types.ModuleType(module_name)
+    exec(compile(source, path, 'exec'), compiled.__dict__)
+    return compiled
+
+def load():
+    '''the built module, if it was built from this grammar (by this version), else None.
+    (the module checks that itself, first thing, and isn't imported otherwise.)
+    '''
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        return None
+
+def signature(tree) -> list:
+    '''the tree's values, with their types (`Tree` equality doesn't tell an `Operand` from a `str`).
+    '''
+    return [(type(value), value) for value in FlatTree(tree).values]
+
+def parity(lines: [str], compiled) -> [str]:
+    '''the lines that the compiled grammar parses differently from the interpreter, i.e. none.
+
+    >>> compiled = module(generate())
+    >>> lines = [line for line in open('test/example.note').read().splitlines() if line.strip()]
+    >>> lines += ['3   =   1+2 * 3+4   /   7', 'x < y where z', 'a ~ b but c ~ d', '+ ACh', '5-HT -> + ACh', 'http://a.com/b -> 50%']
+    >>> lines += ['x' + ' '*9 + '-> y', 'x -> y\\n -> z', '[x] (y) "z"', 'a . b . c', 'a - 1-2 - b']
+    >>> parity(lines, compiled)
+    []
+    '''
+    import parsing
+
+    different = []
+    for line in lines:
+        tree = parsing.recursive_regex(line)
+        if signature(compiled.recursive_regex(line)) != signature(tree):
+            different.append(line)
+    return different
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -7,7 +7,9 @@ import notes as N
 import db
 import visualization
 import disk
+import corpus
 import nlp
+import codegen
 
 
 def get_args():
@@ -69,6 +71,21 @@ def get_args():
                       default='',
                       help='takes a (natural language) string and parses it')
 
+    args.add_argument('--range',
+                      type=str,
+                      default='',
+                      help='only the notes START:STOP (or the one note N) of each file, via its index')
+    args.add_argument('--stream',
+                      action='store_true',
+                      help='read the files lazily, note by note, instead of all at once')
+    args.add_argument('--build',
+                      action='store_true',
+                      help='compile the grammar into a parser (see `codegen.py`), checked against the interpreter on the files')
+    args.add_argument('--jobs', '-j',
+                      type=int,
+                      default=1,
+                      help='read and parse with N processes (0 means one per core)')
+
     args.add_argument('files',
                       nargs='*',
                       help='zero or more `.note` files (defaults to Dropbox)')
@@ -93,8 +110,26 @@ def main():
     if args.parse:
         args.files = [args.parse]
 
-    files = disk.read_files(args.files)
-    notes = N.make_notes(files)
+    if args.build:
+        compiled = codegen.module(codegen.generate())
+        lines = [line for file in (args.files or ['test/example.note']) for line in open(file).read().splitlines() if line.strip()]
+        different = codegen.parity(lines, compiled)
+        if different:
+            print('not built, %d lines parse differently:' % len(different))
+            for line in different:
+                print(repr(line))
+            return
+        print('built %s (%d lines checked)' % (codegen.build(), len(lines)))
+        return
+
+    if args.range:
+        files = disk.make_files(args.files)
+        notes = list(corpus.select(files, corpus.parse_range(args.range)))
+    elif args.stream:
+        notes = N.Stream(args.files)
+    else:
+        files = disk.read_files(args.files)
+        notes = N.make_notes(files, jobs=args.jobs)
 
     if args.english:
         line = args.english
@@ -120,7 +155,7 @@ def main():
     if args.write:
         db.collection().remove() #HACK addToSet duplicates
         if args.test: h1('WRITE')
-        N.write_notes_to_database(notes)
+        N.write_notes_to_database(notes, jobs=args.jobs)
 
     if args.p:
         head = parse.string(args.p)
@@ -128,8 +163,7 @@ def main():
 
     if args.parse:
         print()
-        for note in notes:
-            head, body = parse.note(note)
+        for head, body in parse.each_note(notes, jobs=args.jobs):
             print(head.graph.edges)
             for limb in body:
                 print(limb.graph.edges)
@@ -148,7 +182,7 @@ def main():
 
     if args.note:
         if args.test: h1('NOTES')
-        N.print_notes(notes)
+        N.print_notes(notes, jobs=args.jobs)
 
     if args.visualize:
         if args.test: h1('GRAPH')
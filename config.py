@@ -1,4 +1,5 @@
 import yaml
+import hashlib
 from collections import defaultdict
 from collections import OrderedDict
 from multimethod import multimethod
@@ -16,6 +17,8 @@ default_operator, = operators.pop('__default__')
 
 operator_precedence = syntax['precedence']
 
+engine = syntax['engine']
+
 
 visualization = yaml.load(open('visualization.yaml'))
 order = visualization['order']
@@ -31,11 +34,22 @@ tokens = syntax['tokens']
 tokens = [(token, [escape_verbose_regex(regex) for regex in regexes])
           for _ in tokens
           for token, regexes in _.items()]
+tokens_hash = hashlib.sha1(repr(syntax['tokens']).encode('utf-8')).hexdigest()
+# changes whenever the token table does, e.g. to invalidate the vocabulary
 
 
 semantics = yaml.load(open('semantics.yaml'))
 
 
+cache = yaml.load(open('cache.yaml'))
+
+vocabulary = yaml.load(open('vocabulary.yaml'))
+
+grammar_files = ['syntax.yaml', 'operators.yaml', 'parsers.yaml']
+grammar_hash = hashlib.sha1(b''.join(open(file, 'rb').read() for file in grammar_files)).hexdigest()
+# changes whenever the grammar does, e.g. to invalidate cached parses
+
+
 parser_precedence = syntax['parsers']
 
 parsers = yaml.load(open('parsers.yaml'))
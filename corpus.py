@@ -0,0 +1,157 @@
+'''
+memory-mapped `.note` files, indexed by note.
+
+    corpus = Corpus('drugs.note')
+    corpus[3]           # the fourth note
+    corpus[10:20]       # notes 10 through 19
+    corpus.shard(2, 8)  # the third of eight (contiguous) shards
+
+the index is a sidecar file (e.g. `drugs.note.index`) of each note's (byte offset, lineno),
+found with the same rules as `notes.read`, and rebuilt whenever the file's size or modification time changes.
+with an index, only the notes asked for are decoded from the mapped file.
+
+'''
+import mmap
+import json
+import os
+import itertools
+
+from util import *
+import notes as N
+
+
+def scan(buffer, offset=0):
+    '''decodes the lines of `buffer` from `offset` on, one at a time, with their byte offsets.
+
+    >>> list(scan('A\\n\\nB'.encode('utf-8')))
+    [(0, 'A\\n'), (2, '\\n'), (3, 'B')]
+    '''
+    end = len(buffer)
+    while offset < end:
+        newline = buffer.find(b'\n', offset)
+        stop = end if newline < 0 else newline + 1
+        yield offset, buffer[offset:stop].decode('utf-8')
+        offset = stop
+
+def index(buffer) -> [(int, int)]:
+    '''the (byte offset, lineno) of each note's first line, as `notes.read_lines` would block them.
+
+    >>> index('\\nA\\n= x\\n\\nB\\n'.encode('utf-8'))
+    [(1, 1), (8, 4)]
+    '''
+    notes = []
+    in_block = False
+
+    for lineno, (offset, line) in enumerate(scan(buffer)):
+        line = line.strip()
+        if line and not in_block:
+            notes.append((offset, lineno))
+            in_block = True
+        if N.is_sep(line):
+            in_block = False
+
+    return notes
+
+def parse_range(string: str) -> slice:
+    '''
+    >>> parse_range('3')
+    slice(3, 4, None)
+    >>> parse_range('-1')
+    slice(-1, None, None)
+    >>> parse_range('10:20')
+    slice(10, 20, None)
+    >>> parse_range(':5')
+    slice(None, 5, None)
+    '''
+    if ':' not in string:
+        i = int(string)
+        return slice(i, i+1 or None)
+    start, stop = (int(_) if _ else None for _ in string.split(':', 1))
+    return slice(start, stop)
+
+class Corpus:
+    '''a `.note` file, memory-mapped and indexed by note.
+    '''
+    def __init__(self, file: str):
+        self.file = file
+        self.size = os.path.getsize(file)
+        self.mtime = os.path.getmtime(file)
+
+        if self.size:
+            with open(file, 'rb') as handle:
+                self.buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buffer = b''  # can't map an empty file
+
+        self.index = self.load() or self.save()
+
+    @property
+    def sidecar(self):
+        return self.file + '.index'
+
+    def load(self):
+        '''the index in the sidecar file, unless the file changed since.
+        '''
+        try:
+            with open(self.sidecar) as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return
+
+        if data.get('size') == self.size and data.get('mtime') == self.mtime:
+            return [tuple(_) for _ in data['notes']]
+
+    def save(self):
+        '''indexes the file, then saves the index to the sidecar file (if it can).
+        '''
+        notes = index(self.buffer)
+        data = {'size': self.size, 'mtime': self.mtime, 'notes': notes}
+        try:
+            with open(self.sidecar, 'w') as handle:
+                json.dump(data, handle)
+        except OSError:
+            pass
+        return notes
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return self.notes()
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            return list(itertools.islice(self.notes(start, stop), 0, None, step))
+        else:
+            i = range(len(self))[item]
+            note, = self.notes(i, i+1)
+            return note
+
+    def notes(self, start=0, stop=None) -> [N.Note]:
+        '''decodes the notes from `start` to `stop`, jumping straight to the first.
+        '''
+        if stop is None: stop = len(self)
+        if start >= stop: return
+
+        offset, lineno = self.index[start]
+        lines = (line for _, line in scan(self.buffer, offset))
+        blocks = N.read_lines(lines, file=self.file, start=lineno)
+        blocks = itertools.islice(blocks, stop - start)
+        yield from filter(bool, (N.notify(self.file, block) for block in blocks))
+
+    def shard(self, i: int, n: int) -> [N.Note]:
+        '''the notes of the `i`th of `n` contiguous shards.
+        '''
+        return self.notes(len(self) * i // n, len(self) * (i+1) // n)
+
+def select(files: [str], notes: slice) -> [N.Note]:
+    '''some notes of each file, e.g. `select(files, parse_range('10:20'))`
+    '''
+    for file in files:
+        yield from Corpus(file)[notes]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
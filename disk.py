@@ -15,3 +15,11 @@ def read_files(files):
     files = make_files(files)
     for file in files:
         yield open(file).read(), file
+
+def stream_files(files):
+    '''like `read_files`, but yields each open file, to be read line by line.
+    '''
+    files = make_files(files)
+    for file in files:
+        with open(file) as lines:
+            yield lines, file
@@ -1,5 +1,6 @@
 import re
 import io
+import multiprocessing
 
 from util import *
 import parse
@@ -8,6 +9,8 @@ import query
 import syntax
 from Line import Line
 import store
+import disk
+import tokens
 
 
 class Note:
@@ -22,6 +25,7 @@ class Note:
         . words
 
     '''
+    __slots__ = ('head', 'body', 'file')
 
     @typecheck
     def __init__(self, head: str, body: list= None, file: str= ''):
@@ -108,13 +112,18 @@ def read(text: str, file='') -> [Note]:
     Note(head=Line('A2', lineno=2), body=[Line('= x3', lineno=3), Line(': y4', lineno=4)])
     Note(head=Line('B6', lineno=6), body=[Line('~ z7', lineno=7)])
 
+    '''
+    return read_lines(io.StringIO(text), file=file)
+
+def read_lines(lines: iter, file='', start=0) -> [Note]:
+    '''like `read`, from any lines (e.g. a file handle, line by line), numbered from `start`.
+    yields each note as soon as its block closes, so only one note is held at a time.
     '''
     # before
-    lines = io.StringIO(text).readlines()
     block = []
 
     # during
-    for lineno, line in enumerate(lines):
+    for lineno, line in enumerate(lines, start):
         line = Line(line.strip(), lineno=lineno, file=file)
         if line:
             block.append(line)
@@ -133,15 +142,45 @@ def read(text: str, file='') -> [Note]:
         note = Note(head=head, body=body, file=file)
         yield note
 
-def make_notes(files):
+def make_notes(files, jobs=1):
+    '''reads the notes of each file, in `jobs` processes (0 means one per core).
+    '''
     notes = []
 
-    for chars, file in files:
-        blocks = read(chars, file=file)
-        notes.extend(filter(bool, (notify(file, line) for line in blocks)))
+    if jobs == 1:
+        for _ in files:
+            notes.extend(read_file(_))
+
+    else:
+        with multiprocessing.Pool(jobs or None) as pool:
+            for _ in pool.imap(read_file, files):
+                notes.extend(_)
 
     return notes
 
+def read_file(file: (str, str)) -> [Note]:
+    chars, file = file
+    blocks = read(chars, file=file)
+    return list(filter(bool, (notify(file, line) for line in blocks)))
+
+def stream_notes(files) -> [Note]:
+    '''like `make_notes`, but lazily, from (handle, file) pairs (e.g. `disk.stream_files`).
+    '''
+    for lines, file in files:
+        blocks = read_lines(lines, file=file)
+        yield from filter(bool, (notify(file, line) for line in blocks))
+
+class Stream:
+    '''the notes of some files, streamed anew on each iteration.
+
+    holds no notes: each pass re-reads the files line by line,
+    so memory is bounded by the largest note, not the corpus.
+    '''
+    def __init__(self, files):
+        self.files = files
+    def __iter__(self):
+        return stream_notes(disk.stream_files(self.files))
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 def notify(file, lines):
@@ -160,8 +199,8 @@ def partition_bipartite(arcs):
     nodes = list({node for _, *nodes in edges for node in nodes})
     return nodes, edges
 
-def write(note):
-    lines = parse.note(note, lines=True)
+def write(note, lines=None):
+    if lines is None: lines = parse.note(note, lines=True)
     arcs = parse.edges(lines)
     nodes, edges = partition_bipartite(arcs)
 
@@ -192,23 +231,32 @@ def get(line):
             node, = nodes
             yield node
 
-def write_notes_to_database(notes):
-    for note in notes:
-        note.print()
-        nodes, edges = write(note)
-        for node in nodes:
-            print('[node]', node)
-        for edge in edges:
-            print('[edge]', edge)
+def write_notes_to_database(notes, jobs=1):
+    if isa(notes, list):
+        # their words classified in one batch before they're parsed (also by forked workers).
+        # a stream's notes aren't held, so its words are looked up as they're parsed.
+        tokens.ingest(line for note in notes for line in note)
+
+    for note, (head, body) in parse.notes_and_parses(notes, jobs=jobs):
+        write_and_print(note, lines=cons(head, body))
     print()
 
-def print_notes(notes):
-    for note in notes:
+def write_and_print(note, lines=None):
+    '''`write`, logging the note and what it wrote.
+    '''
+    note.print()
+    nodes, edges = write(note, lines=lines)
+    for node in nodes:
+        print('[node]', node)
+    for edge in edges:
+        print('[edge]', edge)
+
+def print_notes(notes, jobs=1):
+    for note, (head, body) in parse.notes_and_parses(notes, jobs=jobs):
         print()
         print()
 
         print('>>>> %s' % note.head)
-        head, body = parse.note(note)
         for edge in (head.graph.edges or []):
             print('     %s' % str(edge))
 
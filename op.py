@@ -63,8 +63,29 @@ def munge_spacing(spacing):
 
     return min_spaces, max_spaces
 
+def freeze(x):
+    '''a hashable copy (e.g. of an operator's definition).
+
+    >>> freeze({'b': [1, 2], 'a': 'x'})
+    (('a', 'x'), ('b', (1, 2)))
+    '''
+    if isinstance(x, dict):
+        return tuple(sorted((key, freeze(val)) for key, val in x.items()))
+    if isinstance(x, list):
+        return tuple(freeze(val) for val in x)
+    return x
+
 
 class Op(tuple):
+    '''operators are immutable flyweights:
+    one instance per (arity, symbols, definition), and
+    everything (e.g. its `id` and hash) is computed once, when it's interned.
+
+    >>> Binop(' -> ', means='causes') is Op(' -> ', means='causes')
+    True
+    '''
+    interned = {}
+
     def __new__(cls, operator, **definition):
         '''
 
@@ -110,14 +131,22 @@ class Op(tuple):
 
         return self
 
-    def __init__(self, *operators, **definition):
-        '''transforms definition, making the config strings into object attributes.
+    @classmethod
+    def intern(cls, symbols, definition) -> 'Op':
+        '''the one operator of this arity, with these symbols, and this definition.
+
+        transforms definition, making the config strings into object attributes.
         keep the `definition` for repacking
         '''
-
         definition = dict_merge(config.default_operator, definition)
         definition.pop('arity', None)
 
+        key = (cls, tuple(symbols), freeze(definition))
+        if key in Op.interned:
+            return Op.interned[key]
+
+        self = tuple.__new__(cls, symbols)
+
         min_spaces, max_spaces = munge_spacing(definition['spacing'])
         self.__dict__['spacing'] = Range(min_spaces, max_spaces)
 
@@ -129,6 +158,22 @@ class Op(tuple):
 
         self.__dict__['definition'] = definition
 
+        # uniquely identifies an operator (wrt parsing)
+        self.__dict__['id'] = (cls.__name__, tuple(self), self.spaces)
+        self.__dict__['hash'] = hash(self.id)
+
+        Op.interned[key] = self
+        return self
+
+    def __init__(self, *operators, **definition):
+        '''(an operator is set up once, when it's interned)'''
+
+    def __setattr__(self, attr, value):
+        raise AttributeError('operators are immutable (they are shared)')
+
+    def __delattr__(self, attr):
+        raise AttributeError('operators are immutable (they are shared)')
+
     def __repr__(self):
         args = [repr(_) for _ in self]
 
@@ -159,20 +204,28 @@ class Op(tuple):
         '''
         return self.__class__(*self, **self.definition)
 
-    def __eq__(self, other):
-        return self.id == other.id
+    def __getnewargs_ex__(self):
+        '''pickles like `__copy__` constructs.
 
-    def __hash__(self):
-        return hash(self.id)
+        >>> import pickle
+        >>> op = Op(' -> ', means='causes')
+        >>> assert pickle.loads(pickle.dumps(op)) == op
+        >>> pickle.loads(pickle.dumps(op)).means
+        'causes'
+        '''
+        return tuple(self), self.definition
 
-    @property
-    def id(self):
-        '''uniquely identifies an operator (wrt parsing)
+    def __getstate__(self):
+        '''nothing but the constructor's arguments:
+        unpickling interns the operator anew, e.g. with this process's hash.
         '''
-        arity = self.__class__.__name__
-        symbols = tuple(self)
-        spaces = self.spaces
-        return (arity, symbols, spaces)
+        return None
+
+    def __eq__(self, other):
+        return self is other or self.id == other.id
+
+    def __hash__(self):
+        return self.hash
 
     def default(self):
         '''for cleaner doctests
@@ -187,6 +240,20 @@ class Op(tuple):
     def spaces(self):
         return min(sum(1 for _ in _ if _==' ')//2 for _ in self)
 
+    @property
+    def pattern(self):
+        '''the compiled `regex`, compiled once per operator.
+
+        >>> op = Binop(' -> ')
+        >>> assert op.pattern is op.pattern
+        >>> op.pattern.split('x -> y')
+        ['x', ' -> ', 'y']
+
+        '''
+        if 'pattern' not in self.__dict__:
+            self.__dict__['pattern'] = re.compile(self.regex(), re.UNICODE)
+        return self.__dict__['pattern']
+
     def strip(self):
         return self.__class__(*[_.strip() for _ in self], **self.definition)
 
@@ -195,8 +262,8 @@ class Nulop(Op):
     '''the nullary operator.
     '''
 
-    def __new__(cls, *args, **kwargs):
-        return tuple.__new__(cls)
+    def __new__(cls, *args, **definition):
+        return cls.intern((), definition)
 
     def format(self, *_): return ''
 
@@ -205,7 +272,7 @@ class Unop(Op):
     '''a unary operator.
     '''
     def __new__(cls, symbol, **definition):
-        return tuple.__new__(cls, (symbol,))
+        return cls.intern((symbol,), definition)
 
     def whiten(self, n):
         op, = self
@@ -249,7 +316,7 @@ class Binop(Op):
 
     def __new__(cls, *symbols, **definition):
         symbols = sorted(symbols, key=len, reverse=True)
-        return tuple.__new__(cls, symbols)
+        return cls.intern(symbols, definition)
 
     def whiten(self, n):
         """decrease precedence of operator by adding `n` spaces.
@@ -284,7 +351,7 @@ class Binop(Op):
 class Ternop(Op):
     '''a ternary operator.'''
     def __new__(cls, l, r, **definition):
-        return tuple.__new__(cls, (l, r))
+        return cls.intern((l, r), definition)
 
     def whiten(self, n):
         """decrease precedence of operator by adding spaces.
@@ -309,6 +376,32 @@ class Ternop(Op):
         regex = regex.format(*operators, **operands)
         return regex
 
+    def partition(self, line: str) -> (str, str, str):
+        '''the operands around the symbols, like (a search with) the greedy `regex`,
+        i.e. around the last left symbol before the last right symbol.
+        None if there's no match.
+
+        a linear scan (`str.rfind`), so a line full of one symbol but without the other doesn't backtrack.
+
+        >>> Ternop(' < ', ' where ').partition('a < b < c where d where e')
+        ('a < b', 'c where d', 'e')
+        >>> Ternop(' < ', ' where ').partition('a < b < c')
+        '''
+        if '\n' in line:
+            # `.` doesn't match a newline
+            match = self.pattern.search(line)
+            return match and match.group('A', 'B', 'C')
+
+        l, r = self
+        j = line.rfind(r)
+        if j < 0:
+            return None
+        i = line.rfind(l, 0, j)
+        if i < 0:
+            return None
+
+        return (line[:i], line[i + len(l):j], line[j + len(r):])
+
     def format(self, *operands):
         '''
 
@@ -325,10 +418,7 @@ class Narop(Op):
     '''an n-ary operator. like binary, is chainable. unlike binary, it is not left-associated, so the 2+ operands are all passed to the verb.
     '''
     def __new__(cls, symbol, **definition):
-        return tuple.__new__(cls, (symbol,))
-
-    def __init__(self, symbol, **definition):
-        super().__init__(symbol, **definition)
+        return cls.intern((symbol,), definition)
 
     def whiten(self, n):
         """decrease precedence of operator by adding `n` spaces.
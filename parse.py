@@ -34,21 +34,119 @@ Tree((Binop('='), [(Binop(':'), [(Binop(','), [(Binop(','), ['x', 'y']), 'z']),
 import re
 from operator import itemgetter
 import itertools
+import multiprocessing
 from multimethod import multimethod
 from collections import OrderedDict
 from collections import namedtuple
 
 from util import *
-from parsing import CST, AST
+from parsing import CST, CST_after, AST, Source, placeholder, is_atom, is_split_off, operand
+from tree import FlatTree, sharing
 import config
 import context
+import cache
 import Graph
 from Edge import Edge
 import notes as N
 from Line import Line
 
 
-Parsed = namedtuple('Parsed', 'line cst ast graph head parser')
+class Parsed:
+    '''the parse of a line:
+
+        line   ~ the `Line` parsed
+        cst    ~ the concrete syntax tree (as a `Source`, i.e. spans of the line)
+        ast    ~ the abstract syntax tree
+        graph  ~ the edges (and nodes) harvested from the AST
+        head   ~ the noun that the body lines are in the context of
+        parser ~ the name of the parser
+
+    like a namedtuple of those, whose `cst`, `ast`, and `graph` (with `head`) are computed on first access when not given,
+    each from the one before (from the line, by `default`).
+
+    `drop` forgets the trees once the graph is extracted (they're reparsed from the line if asked for again),
+    e.g. to hold many parses in a long-running process.
+
+    >>> parsed = Parsed(Line('x -> y'))
+    >>> parsed.graph.edges
+    [('causes', 'x', 'y')]
+    >>> parsed.drop().cst == CST('x -> y')
+    True
+    '''
+    __slots__ = ('line', 'parser', '_cst', '_ast', '_graph', '_head', '_tree')
+    _fields = ('line', 'cst', 'ast', 'graph', 'head', 'parser')
+
+    def __init__(self, line, cst=None, ast=None, graph=None, head=None, parser='default'):
+        '''(`None` means "computed on first access", and the `head` is computed with the `graph`)
+        '''
+        self.line = line
+        self.parser = parser
+        self._cst = cst
+        self._ast = ast
+        self._graph = graph
+        self._head = head
+        self._tree = None # the CST as a `Tree`, until the AST is made from it
+
+    @property
+    def cst(self) -> Source:
+        if self._cst is None:
+            self._tree = CST(self.line.text)
+            self._cst = Source(self.line.text, self._tree)
+        return self._cst
+
+    @property
+    def ast(self) -> 'Tree':
+        if self._ast is None:
+            cst = self.cst
+            tree, self._tree = self._tree, None
+            self._ast = AST(cst.tree() if tree is None else tree)
+        return self._ast
+
+    @property
+    def graph(self) -> Graph.Graph:
+        if self._graph is None:
+            self._head, self._graph = Graph.Graph.harvest(self.ast)
+        return self._graph
+
+    @property
+    def head(self) -> str:
+        self.graph
+        return self._head
+
+    def drop(self) -> 'Parsed':
+        '''forgets the trees, after extracting the graph (the parses of other parsers have none).
+        '''
+        self.graph
+        if self.parser == 'default':
+            self._cst = self._ast = None
+        return self
+
+    def __iter__(self):
+        return iter(getattr(self, field) for field in self._fields)
+
+    def __eq__(self, other):
+        return isinstance(other, Parsed) and tuple(self) == tuple(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Parsed(%s)' % ', '.join('%s=%r' % (field, getattr(self, field)) for field in self._fields)
+
+    def _asdict(self):
+        return OrderedDict((field, getattr(self, field)) for field in self._fields)
+
+    def _replace(self, **fields):
+        '''a copy, with some fields replaced (and the others computed as lazily as they are here).
+        '''
+        values = {'line': self.line, 'cst': self._cst, 'ast': self._ast, 'graph': self._graph, 'head': self._head, 'parser': self.parser}
+        values.update(fields)
+        return Parsed(**values)
+
+    def __getstate__(self):
+        return (self.line, self._cst, self._ast, self._graph, self._head, self.parser)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
 
 parsers = {}
 @decorator
@@ -72,10 +170,106 @@ def default(line):
     ast ~ clean up and binarize the Binop subtrees
     graph ~ get edges from the parse tree
     '''
-    cst = CST(line.text)
-    ast = AST(cst)
-    head, graph = Graph.Graph.harvest(ast)
-    return Parsed(line, cst, ast, graph, head, 'default')
+    return Parsed(line) # each computed when first asked for
+
+def harvest(line: Line, cst: 'Tree') -> Parsed:
+    '''`default`, given the CST.
+    '''
+    parsed = Parsed(line, Source(line.text, cst)) # the CST kept as spans of the line
+    parsed._tree = cst
+    return parsed
+
+head_trees = cache.Cache(size=config.cache['size'])
+# the CST of each head (see `body`), parsed once for all the body lines of its note
+
+def head_tree(head: str) -> 'Tree':
+    tree = head_trees.get(head)
+    if tree is None:
+        tree = CST(head)
+        head_trees.put(head, tree)
+    return tree
+
+Template = namedtuple('Template', 'holes parsed leaf strings')
+# an ellipsis head, compiled for its items (see `fill`):
+#     holes   ~ the items' format (see `context.ellipsis`), e.g. '%s -> + ACh'
+#     parsed  ~ the holes parsed once, with `parsing.placeholder` as the item (None if an item can't be filled in)
+#     leaf    ~ the indices of the placeholder's leaf, in the CST and in the AST (as `FlatTree`s)
+#     strings ~ the strings of `parsed` (which the strings of a filled-in item mustn't collide with)
+
+templates = cache.Cache(size=config.cache['size'])
+
+def template(head: str) -> Template:
+    '''the template of an ellipsis head, compiled once for all the items of its note.
+    '''
+    compiled = templates.get(head)
+    if compiled is None:
+        holes = context.get('ellipsis', head, '')
+        compiled = Template(holes, None, None, None)
+
+        if holes.count('%s') == 1 and '%' not in holes.replace('%s', ''):
+            line = holes % placeholder
+            cst = FlatTree(CST(line))
+            leaves = placeholders(cst)
+
+            if len(leaves) == 1 and is_split_off(cst, leaves[0]):
+                try:
+                    parsed = harvest(Line(line), cst.tree())
+                    parsed.graph
+                except Exception:
+                    # e.g. a head that the reducers can't harvest: its items are parsed (and fail) one by one, as ever
+                    parsed = None
+
+                if parsed:
+                    ast = FlatTree(parsed.ast)
+                    strings = {string for string in ast.values if isinstance(string, str)}
+                    strings |= {node for edge in parsed.graph.edges for node in edge.nodes}
+                    strings |= set(parsed.graph.nodes) | {parsed.head}
+                    compiled = Template(holes, parsed, leaves + placeholders(ast), strings)
+
+        templates.put(head, compiled)
+    return compiled
+
+def placeholders(tree: FlatTree) -> [int]:
+    return [i for i, value in enumerate(tree.values) if isinstance(value, str) and value == placeholder]
+
+def fill(template: Template, item: Line) -> Parsed:
+    '''the item in its template, as `default` would parse it, without parsing it:
+    the item replaces the placeholder, in each tree and each string.
+
+    None when the item can't be filled in: when it isn't an operand there (see `parsing.operand`),
+    or when it'd make two strings equal (which `harvest` would have merged).
+
+    >>> item = fill(template('... -> + ACh'), Line('vitamin E'))
+    >>> item.graph.edges
+    [('causes', 'vitamin E', '+ ACh')]
+    >>> item == default(Line('vitamin E -> + ACh'))
+    True
+    >>> fill(template('... -> + ACh'), Line('x , y'))
+    '''
+    if template.parsed is None: return
+    text = escape(item.text) # as `body` puts it in its context
+    if placeholder in text or not is_atom(text): return
+    leaf = operand(text)
+    if leaf is None: return
+
+    def substitute(string):
+        if not isinstance(string, str) or placeholder not in string: return string
+        return leaf if string == placeholder else string.replace(placeholder, text)
+
+    if len({substitute(string) for string in template.strings}) < len(template.strings): return
+
+    parsed = template.parsed
+    line = Line(template.holes % text, lineno=item.lineno, file=item.file)
+
+    cst, ast = [FlatTree(tree) for tree in [parsed.cst.tree(), parsed.ast]]
+    cst.values[template.leaf[0]] = leaf
+    ast.values[template.leaf[1]] = leaf
+
+    edges = [Edge(edge.label, type(edge.nodes)(substitute(node) for node in edge.nodes), line=edge.line)
+             for edge in parsed.graph.edges]
+    graph = Graph.Graph([substitute(node) for node in parsed.graph.nodes], edges)
+
+    return Parsed(line, Source(line.text, cst), ast.tree(), graph, substitute(parsed.head), 'default')
 
 @parser
 def ellipsis(line):
@@ -99,8 +293,15 @@ def head(line: Line) -> Parsed:
         regex = definition['regex']
         if re.search(regex, line): break
 
+    key = cache.key(line, parser)
+    cached = cache.parses.get(key)
+    if cached:
+        return cache.unpack(cached, lineno=line.lineno, file=line.file)
+
     parse = parsers[parser]
-    return parse(line)
+    parsed = parse(line)
+    cache.parses.put(key, cache.pack(parsed))
+    return parsed
 
 @typecheck
 def body(parsed: Parsed, body_line: Line) -> Parsed:
@@ -118,11 +319,32 @@ def body(parsed: Parsed, body_line: Line) -> Parsed:
         return parsers['comment'](body_line)
 
     head_line = parsed.head
+
+    # the body line in the context of its head
+    key = cache.key(body_line, body_parser, context=(head_parser, str(head_line)))
+    cached = cache.parses.get(key)
+    if cached:
+        return cache.unpack(cached, lineno=body_line.lineno, file=body_line.file)
+
+    if head_parser == 'ellipsis' and body_parser == 'default':
+        # e.g. "vitamin E" under "... -> + ACh", filled into the head's template (by the note's other items)
+        parsed = fill(template(str(head_line)), body_line)
+        if parsed:
+            cache.parses.put(key, cache.pack(parsed))
+            return parsed
+
     holes = context.get(head_parser, head_line, body_line)
     line = holes % escape(body_line)
     line = Line(line, lineno=body_line.lineno, file=body_line.file)
 
-    return parse(line)
+    head = str(head_line)
+    if body_parser == 'default' and holes != '%s' and line.text.startswith(head):
+        # e.g. "head = body", whose head was already parsed (by the note's other body lines)
+        parsed = harvest(line, CST_after(head, head_tree(head), line.text[len(head):]))
+    else:
+        parsed = parse(line)
+    cache.parses.put(key, cache.pack(parsed))
+    return parsed
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -140,25 +362,82 @@ def note(note: 'Note', lines=False) -> (Parsed, Parsed):
     if lines: return cons(h,b)
     return h, b
 
+def each_note(notes: '[N.Note]', jobs=1) -> [(Parsed, [Parsed])]:
+    '''`note` over each note, in order, in `jobs` processes (see `parallel`).
+    '''
+    for _, parses in notes_and_parses(notes, jobs=jobs):
+        yield parses
+
+def notes_and_parses(notes: '[N.Note]', jobs=1) -> [('N.Note', (Parsed, [Parsed]))]:
+    '''`each_note`, with each note, in one pass over the notes (e.g. over a stream, which isn't held).
+    '''
+    if jobs == 1:
+        for _ in notes:
+            yield _, note(_)
+    else:
+        yield from parallel(notes, jobs=jobs)
+
+def parallel(notes: '[N.Note]', jobs=None, chunksize=16, lines=256) -> [('N.Note', (Parsed, [Parsed]))]:
+    '''`note` over each note, in a pool of `jobs` processes (by default, one per core).
+
+    a task is a note, or at most `lines` lines of a long note's body (with its head, as their context).
+    tasks are dispatched `chunksize` at a time, from a window of `jobs * chunksize` notes at a time
+    (as `imap` reads all of its tasks at once), so only a window of the notes is held.
+    yields each note with its (head, body), in order, as `note` would.
+    '''
+    notes = iter(notes)
+    window = (jobs or multiprocessing.cpu_count()) * chunksize
+
+    with multiprocessing.Pool(jobs or None, initializer=cache.detach) as pool:
+        for held in iter(lambda: list(itertools.islice(notes, window)), []):
+            results = pool.imap(parse_task, tasks(held, lines), chunksize)
+
+            for i, group in itertools.groupby(results, key=itemgetter(0)):
+                h, *b = [parsed for _, parses in group for parsed in parses]
+                yield held[i], (h, b)
+
+def tasks(notes: '[N.Note]', lines: int):
+    '''
+    >>> from Line import Line
+    >>> _ = N.Note(Line('x'), [Line('= %d' % i) for i in range(5)])
+    >>> [(i, len(body), first) for (i, _, body, first) in tasks([_], 2)]
+    [(0, 2, True), (0, 2, False), (0, 1, False)]
+    '''
+    for i, _ in enumerate(notes):
+        for start in range(0, len(_.body) or 1, lines):
+            yield i, _.head, _.body[start : start+lines], start == 0
+
+def parse_task(task) -> (int, [Parsed]):
+    '''parses a task of `parallel` (in a worker process).
+    '''
+    i, head_line, body_lines, first = task
+    h = head(head_line)
+    b = [body(h, line) for line in body_lines]
+    return i, (cons(h, b) if first else b)
+
 @typecheck
 def string(line: str) -> Parsed:
     line = Line(line)
     return head(line)
 
+def session():
+    '''parses lines together, whose ASTs share their equal subtrees if `cache.yaml` says to (see `tree.sharing`).
+    '''
+    return sharing(config.cache['share'])
+
 @multimethod(str)
-def parse(text: str) -> [Parsed]:
+def parse(text: str, jobs=1) -> [Parsed]:
     notes = N.read(text)
-    return parse(notes)
+    return parse(notes, jobs=jobs)
 
 @multimethod(object)
-def parse(notes: '[N.Note]') -> [Parsed]:
+def parse(notes: '[N.Note]', jobs=1) -> [Parsed]:
     '''
     '''
-    for _ in notes:
-        head, body = note(_)
-
-        yield head
-        yield from body
+    with session():
+        for head, body in each_note(notes, jobs=jobs):
+            yield head
+            yield from body
 
 
 if __name__ == "__main__":
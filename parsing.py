@@ -1,11 +1,13 @@
 import re
-from copy import copy
+from array import array
+from collections import namedtuple
 
 from util import *
 from op import Op, Nulop, Unop, Narop, Binop, Ternop
-from tree import Tree
+from tree import Tree, FlatTree
 import syntax
 import tokens
+import config
 
 
 def get_max_spaces(line: str):
@@ -32,49 +34,238 @@ def get_spacing(line, min_spaces=0):
     spacing = reversed(range(min_spaces, 1+max_spaces))
     return spacing
 
+#:: {int: SymbolTable}
+symbol_tables = {}
+# for each list of operators (e.g. `syntax.precedence`), by its id:
+#     symbols   ~ maps each symbol to the (operator, role) pairs it's a symbol of
+#     climbable ~ the operators that `scan` can find (see `is_climbable`)
+#     bounded   ~ whether every spaced operator is climbable (so the line's spacing is bounded by the scan)
+# the role is 0 for a Binop's (or a Narop's) alternative symbols, and 0 or 1 for a Ternop's left or right symbol.
+SymbolTable = namedtuple('SymbolTable', 'operators symbols climbable bounded')
+
+def get_symbol_table(operators) -> SymbolTable:
+    '''the table of a list of operators, built once per list (the lists are built once, by `syntax`).
+    '''
+    table = symbol_tables.get(id(operators))
+    if table is None or table.operators is not operators:
+        symbols = defaultdict(list)
+        climbable = {operator for operator in operators if is_climbable(operator)}
+        for operator in climbable:
+            for role, symbol in enumerate(operator):
+                symbols[symbol].append((operator, role if isa(operator, Ternop) else 0))
+        bounded = all(operator in climbable for operator in operators if operator.spacing.max >= 1)
+        table = symbol_tables[id(operators)] = SymbolTable(operators, dict(symbols), climbable, bounded)
+    return table
+
+def scan(operators, line: str) -> {Op: int}:
+    '''the most spaces that each operator occurs with in the line (none if it doesn't occur spaced).
+
+    one pass over the words of the line, each looked up in a table of the operators' symbols
+    (a spaced symbol is a whole word, with at least as many spaces on each side).
+
+    >>> levels = scan(syntax.precedence, 'x' + ' '*40 + '->  y , z')
+    >>> sorted((str(operator), spaces) for operator, spaces in levels.items())
+    [(',', 1), ('->', 2)]
+    '''
+    table = get_symbol_table(operators).symbols
+    words = [word.span() for word in re.finditer(r'[^ ]+', line)]
+
+    roles = {}
+    for k, (start, end) in enumerate(words):
+        before = start - (words[k-1][1] if k else 0)
+        after = (words[k+1][0] if k+1 < len(words) else len(line)) - end
+        spaces = min([before, after])
+        if not spaces: continue
+
+        for operator, role in table.get(line[start:end], ()):
+            if roles.get((operator, role), 0) < spaces:
+                roles[operator, role] = spaces
+
+    levels = {}
+    for operator, role in roles:
+        if isa(operator, Ternop):
+            # needs both of its symbols
+            if (operator, 0) in roles and (operator, 1) in roles:
+                levels[operator] = min([roles[operator, 0], roles[operator, 1]])
+        else:
+            levels[operator] = roles[operator, role]
+    return levels
+
 @strict
-def get_operators(operators, line):
+def get_operators(operators, line, spacing=None):
     '''returns an operator of each precedence given the line to parse. 'precedence' means 'number of spaces', bounded below by the operator definition and bounded above by the number of spaces in the line.
+
+    only the operators that occur in the line (see `scan`), at the spacings they occur with.
+    an operator that doesn't occur can't parse any leaf (a substring of the line).
+    0-space passes also mark tokens as `Operand`:
+    if any are skipped after the last that runs, the nullary operator's pass (which only marks tokens) runs instead.
+
+    the whitened operators come from the grammar table (see `syntax.whiten`), not rebuilt per line.
+
+    >>> operators = syntax.operators['->']
+    >>> [str(_) for _ in get_operators(operators, 'x  ->  y')]
+    ['->', '->']
+    >>> assert get_operators(operators, 'x -> y')[0] is get_operators(operators, 'x -> z')[0]
+    >>> get_operators(syntax.precedence, 'x')
+    [Nulop(means='')]
     '''
-    for num_spaces in get_spacing(line):
+    if spacing is None: spacing = get_spacing(line)
+
+    table = get_symbol_table(operators)
+    levels = scan(operators, line)
+    if table.bounded:
+        max_level = max(levels.values()) if levels else 0
+        spacing = [num_spaces for num_spaces in spacing if num_spaces <= max_level]
+
+    for num_spaces in spacing:
+        skipped = False
         for operator in operators:
             if num_spaces in operator.spacing:
-                yield operator.whiten(num_spaces)
+                whitened = syntax.whiten(operator, num_spaces)
+
+                if not num_spaces:
+                    skipped = not occurs(whitened, line)
+                    if skipped: continue
+                elif operator in table.climbable:
+                    if levels.get(operator, 0) < num_spaces: continue
+                elif not occurs(whitened, line):
+                    continue
+
+                yield whitened
+
+        if skipped:
+            yield syntax.nulop
+
+def occurs(operator: Op, line: str) -> bool:
+    '''whether the (whitened) operator's symbols are in the line, as any parse of it needs.
+
+    >>> assert occurs(Binop(' -> '), 'x -> y')
+    >>> assert not occurs(Binop('  ->  '), 'x -> y')
+    >>> assert not occurs(Ternop(' < ', ' where '), 'x < y')
+    '''
+    if isa(operator, Ternop):
+        return all(symbol in line for symbol in operator)
+    else:
+        return any(symbol in line for symbol in operator)
 
 class Symbol(str):
-    def __getattribute__(self, attr):
-        '''transparently return a Symbol for any str method call that returns a str.
+    '''a str tagged by its type (e.g. `Operator`), without an instance dict.
+
+    only `strip` (what `AST` and `parse_binop` call) returns a Symbol,
+    other str methods return a plain str.
+    '''
+    __slots__ = ()
 
+    def strip(self, chars=None):
+        '''
         >>> isinstance(Symbol('Symbol').strip(), Symbol)
         True
         >>> isinstance(Symbol('Symbol').split(), list)
         True
         '''
+        return Symbol(str.strip(self, chars))
 
-        attr = super().__getattribute__(attr)
-        if hasattr(attr, '__call__'):
-            def symbolize(*args, **kwargs):
-                ret = attr(*args, **kwargs)
-                ret = Symbol(ret) if isinstance(ret, str) else ret
-                return ret
-            return symbolize
-        else:
-            return attr
+    def __reduce__(self):
+        '''
+        >>> import pickle
+        >>> type(pickle.loads(pickle.dumps(Operator(' -> '))))
+        <class 'parsing.Operator'>
+        '''
+        return (type(self), (str(self),))
 
 class Operator(Symbol):
     '''the line (regex) parsers wrap operators in Operator's, and the tree parsers skips them (meaning, "already parsed").
     '''
+    __slots__ = ()
 
 class Operand(Symbol):
     '''the tree parsers skips them (meaning, "already parsed").
     '''
+    __slots__ = ()
 
 def unparse(tree):
     '''
     >>> line = '3   =   1+2 * 3+4   /   7'
     >>> assert unparse(CST(line)) == line
+    >>> assert unparse(Source(line, CST(line))) == line
     '''
-    return ''.join(flatten(tree.leaves()))
+    if isinstance(tree, Source):
+        return tree.unparse()
+
+    tree = FlatTree(tree)
+    return ''.join(value for i, value in enumerate(tree.values) if i and tree.is_leaf(i))
+
+class Source:
+    '''a CST as spans of its line:
+
+        values  ~ the operator of each branch, the type (e.g. `Operator`) of each leaf
+        parents ~ the index of each node's parent (-1 for the root)
+        starts, stops ~ where each node is in the line
+
+    (in pre-order, like `FlatTree`), so a leaf's string is sliced from the line only when it's asked for.
+
+    >>> line = 'x -> y , z'
+    >>> source = Source(line, CST(line))
+    >>> source.tree() == CST(line)
+    True
+    >>> source.unparse() == line
+    True
+    >>> [source.span(i) for i in range(len(source)) if source.is_leaf(i)]
+    [(0, 1), (1, 5), (5, 6), (6, 9), (9, 10)]
+    '''
+    __slots__ = ('line', 'values', 'parents', 'starts', 'stops')
+
+    def __init__(self, line: str, tree: Tree):
+        '''from the CST of `line` (whose leaves are the whole line, in order), a `Tree` or a `FlatTree`.
+        '''
+        if not isinstance(tree, FlatTree): tree = FlatTree(tree)
+
+        positions = array('l', [0]) * (len(tree) + 1)
+        values = list(tree.values)
+        position = 0
+        for i, value in enumerate(values):
+            positions[i] = position
+            if tree.is_leaf(i):
+                position += len(value)
+                values[i] = type(value)
+        positions[len(tree)] = position
+
+        self.line = line
+        self.values = values
+        self.parents = array('l', tree.parents)
+        self.starts = positions[:-1]
+        self.stops = array('l', (positions[end] for end in tree.ends))
+
+    def __len__(self):
+        return len(self.values)
+
+    def is_leaf(self, i=0):
+        return i + 1 == len(self.values) or self.parents[i + 1] != i
+
+    def span(self, i=0) -> (int, int):
+        '''the (start, stop) of a node in the line, e.g. to map it back to exact characters.
+        '''
+        return (self.starts[i], self.stops[i])
+
+    def leaf(self, i: int) -> str:
+        return self.values[i](self.line[self.starts[i]:self.stops[i]])
+
+    def tree(self) -> Tree:
+        values = [self.leaf(i) if self.is_leaf(i) else value for i, value in enumerate(self.values)]
+        return FlatTree.arrays(values, list(self.parents)).tree()
+
+    def unparse(self) -> str:
+        return self.line[self.starts[0]:self.stops[0]]
+
+    def __eq__(self, other):
+        if isinstance(other, Source): other = other.tree()
+        return self.tree() == other
+
+    def __repr__(self):
+        return repr(self.tree())
+
+    def __str__(self):
+        return str(self.tree())
 
 def parse_binop(op, line):
     '''parses a line with a binary operator.
@@ -94,8 +285,7 @@ def parse_binop(op, line):
     Tree((Binop(' -> '), ['x', ' -> ', 'y', ' -> ', 'z']))
 
     '''
-    regex = op.regex()
-    trees = re.split(regex, line, re.UNICODE)
+    trees = op.pattern.split(line)
 
     # declare already parsed
     trees = [Operator(word) if word in op else word
@@ -130,13 +320,10 @@ def parse_ternop(op, line):
     >>> parse_ternop(op, 'x ~ y but z').leaves()
     ['x ', '~', ' y ', 'but', ' z']
     '''
-    regex = op.regex()
-    match = re.search(regex, line, re.UNICODE)
+    operands = op.partition(line)
 
-    if match:
-        match = match.groupdict()
+    if operands:
         operators = op
-        operands = [match['A'], match['B'], match['C']]
         trees = stagger(operands, operators)
 
         # declare operator symbols have been parsed
@@ -148,8 +335,22 @@ def parse_ternop(op, line):
     else:
         return Tree(line)
 
+def has_tokens(leaf: str, tokenized: dict) -> bool:
+    '''`tokens.has_tokens`, memoized in `tokenized` (a dict per line being parsed),
+    since the same leaves come back unchanged across the 0-space passes.
+
+    >>> tokenized = {}
+    >>> has_tokens('1+2', tokenized), has_tokens('1+2', tokenized)
+    (False, False)
+    >>> tokenized
+    {'1+2': False}
+    '''
+    if leaf not in tokenized:
+        tokenized[leaf] = tokens.has_tokens(leaf)
+    return tokenized[leaf]
+
 @typecheck
-def parse_op(op: Op, tree: Tree):
+def parse_op(op: Op, tree: Tree, tokenized=None):
     '''parses a line (tree leaf) with some operator.
 
     tries to match some operators to a line,
@@ -158,6 +359,7 @@ def parse_op(op: Op, tree: Tree):
 
     one step of a top-down operator-precedence parse.
     each pass may or may not 'deepen' the tree.
+    `tokenized` memoizes which leaves have tokens (see `has_tokens`), across the passes over a line.
 
     >>> tree = Tree('line : str')
     >>> op = Binop(':')
@@ -180,13 +382,13 @@ def parse_op(op: Op, tree: Tree):
     if not line:
         return Tree(line)
 
-    if isinstance(line, Operand) or isinstance(line, Operator):
+    if isinstance(line, (Operand, Operator)):
         # already parsed
         return Tree(line)
 
     if not op.spaces:
         # 0-space operators must not parse apart tokens
-        if tokens.has_tokens(line):
+        if has_tokens(line, {} if tokenized is None else tokenized):
             return Tree(Operand(line))
 
     if isa(op, Unop) or isa(op, Binop) or isa(op, Narop):
@@ -197,64 +399,356 @@ def parse_op(op: Op, tree: Tree):
 
     return tree
 
-def CST(line: str) -> Tree:
-    '''parse via recursive regex, into a concrete syntax tree.
+engines = {}
+@decorator
+def engine(f):
+    '''decorated by `engine` means:
+
+    * its name may be chosen as `config.engine` (or passed to `CST`)
+    * its type is "str => Tree", a concrete syntax tree (before the nulop wraps an unparsed line)
+    * every engine returns the same tree for the same line
+    '''
+    engines[f.__name__] = f
+    return f
+
+def CST(line: str, engine=None) -> Tree:
+    '''parse into a concrete syntax tree, with `engine` (by name, defaulting to `config.engine`).
 
     >>> CST('a -> b , c , d -> e').leaves()
     ['a', ' -> ', ['b', ' , ', 'c', ' , ', 'd'], ' -> ', 'e']
+
+    >>> line = '3   =   1+2 * 3+4   /   7'
+    >>> assert CST(line, engine='precedence_climbing') == CST(line, engine='recursive_regex')
+    '''
+    if compiled is None: load_compiled()
+    if engine is None: engine = config.engine
+    tree = engines[engine](line)
+
+    if tree.is_leaf():
+        # nothing parsed
+        tree = Tree((syntax.nulop, [tree]))
+
+    return tree
+
+#:: str
+placeholder = '\ue000'
+# an operand without operator symbols or tokens (nor in any note, it's a private-use character),
+# that stands in for a head (see `CST_after`) or for an item (see `parse.fill`)
+
+def is_atom(text: str) -> bool:
+    '''whether no spaced operator can parse any part of `text` (none of its words is a symbol),
+    so it's an operand wherever it's spaced apart from an operator.
+
+    >>> is_atom('jonathan blow'), is_atom('5-HT'), is_atom('x -> y'), is_atom('a - b')
+    (True, True, False, False)
+    '''
+    table = get_symbol_table(syntax.precedence)
+    return (table.bounded and bool(text) and text == text.strip() and
+            not any(word in table.symbols for word in text.split()))
+
+def operand(text: str) -> str:
+    '''the leaf that an atom (see `is_atom`) is, when it's parsed apart from any operator,
+    or None if 0-space operators might split it.
+
+    tagged `Operand` when it has tokens, as the 0-space passes do (see `parse_op`).
+
+    >>> operand('vitamin E'), type(operand('5-HT')).__name__, operand('1+2')
+    ('vitamin E', 'Operand', None)
+    '''
+    if tokens.has_tokens(text):
+        return Operand(text)
+    if any(occurs(syntax.whiten(operator, 0), text) for operator in syntax.precedence if 0 in operator.spacing):
+        return None
+    return text
+
+def is_split_off(tree: FlatTree, i: int) -> bool:
+    '''whether the `i`th node is a leaf split off by a spaced operator, i.e. before the 0-space passes (which parse it alone).
+    '''
+    parent = tree.parents[i]
+    return tree.is_leaf(i) and parent >= 0 and tree.values[parent].spaces > 0
+
+def CST_after(head: str, head_tree: Tree, rest: str) -> Tree:
+    '''`CST(head + rest)`, given `head_tree` (the CST of `head`), parsing only `rest`.
+
+    e.g. a body line in the context of its head, whose CST is parsed once for all the body lines of its note.
+    `rest` is parsed after a `placeholder` operand, then the head's tree is grafted in its place.
+    that's the same tree when the head is an atom (see `is_atom`),
+    and the placeholder is split off by a spaced operator (so the 0-space passes parse the head alone).
+
+    >>> head = 'jonathan blow'
+    >>> CST_after(head, CST(head), ' = jon') == CST(head + ' = jon')
+    True
+    >>> CST_after('a - b', CST('a - b'), ' = c') == CST('a - b = c')
+    True
+    '''
+    if is_atom(head) and rest[:1] == ' ':
+        tree = CST(placeholder + rest)
+
+        path = []
+        leaf = tree
+        while not leaf.is_leaf():
+            path.append(leaf)
+            leaf = leaf[1][0]
+
+        if leaf[0] == placeholder and path and path[-1][0].spaces > 0:
+            value, trees = head_tree
+            if value is syntax.nulop: head_tree, = trees
+
+            tree = head_tree
+            for value, trees in reversed(path):
+                tree = Tree((value, (tree,) + trees[1:]))
+            return tree
+
+    return CST(head + rest)
+
+@engine
+def recursive_regex(line):
+    '''parse via recursive regex: one pass over the tree for each operator at each spacing.
     '''
 
     # e.g. [Binop('=>', '==>'), Ternop('<', 'where')]
     operators = get_operators(syntax.precedence, line)
     tree = Tree(line)
+    tokenized = {}
 
     for operator in operators:
         # parse top-down: grow tree on each regex match
-        tree = tree.tmap(lambda leaf: parse_op(operator, leaf))
+        tree = tree.tmap(lambda leaf: parse_op(operator, leaf, tokenized))
+
+    return tree
+
+def is_climbable(operator):
+    '''whether an operator can be found among the words of a line:
+    when spaced, each of its symbols is a whole (space-delimited) word.
+
+    >>> assert is_climbable(Binop('->'))
+    >>> assert is_climbable(Ternop('<', 'where'))
+    >>> assert not is_climbable(Unop('+'))
+    '''
+    return (isa(operator, (Binop, Narop, Ternop)) and
+            all(symbol and ' ' not in symbol for symbol in operator))
+
+#:: {str: [(int, Op)]}
+climbing_table = defaultdict(list)
+# maps a word to each (precedence, operator) that it's the (leftmost) symbol of,
+# for the operators spaced by 1+ spaces. 0-space operators parse afterwards, like in `recursive_regex`.
+for precedence, operator in enumerate(syntax.precedence):
+    if operator.spacing.max >= 1:
+        symbols = [operator[0]] if isa(operator, Ternop) else operator
+        for symbol in symbols:
+            climbing_table[symbol].append((precedence, operator))
+
+#:: bool
+climbable = all(is_climbable(_) for _ in syntax.precedence if _.spacing.max >= 1)
+
+@engine
+def precedence_climbing(line):
+    '''parse via precedence climbing: split the line into words once, then grow the tree top-down in one pass.
+
+    each operator word binds as tightly as the spaces around it (in the span being parsed) and its precedence allow,
+    which is the first pass of `recursive_regex` that could split it.
+    the loosest-binding operator in a span splits it, and each operand is parsed by the operators after it.
+
+    falls back to `recursive_regex` when some spaced operator is not `is_climbable`.
+
+    >>> precedence_climbing('x , y , z : a = b').leaves()
+    [[['x', ' , ', 'y', ' , ', 'z'], ' : ', 'a'], ' = ', 'b']
+    >>> precedence_climbing('a , b , c < x . y . z where 1 + 2 + 3').leaves()
+    [['a', ' , ', 'b', ' , ', 'c'], ' < ', ['x', ' . ', 'y', ' . ', 'z'], ' where ', ['1', ' + ', '2', ' + ', '3']]
+    '''
+    if not climbable:
+        return recursive_regex(line)
+
+    words = [(word.start(), word.end(), word.group()) for word in re.finditer(r'[^ ]+', line)]
+    tree = climb(line, words, 0, len(words), 0, len(line), (float('+inf'), 0))
 
     if tree.is_leaf():
-        # nothing parsed
-        tree = Tree((syntax.nulop, [tree]))
+        tree = Tree(line)
+
+    tokenized = {}
+    for operator in get_operators(syntax.precedence, line, spacing=[0]):
+        # the 0-space operators, which may split words
+        tree = tree.tmap(lambda leaf: parse_op(operator, leaf, tokenized))
 
     return tree
 
+def is_spaced(words, i, spaces, start, end):
+    '''whether the `i`th word has `spaces` spaces on both sides, within `line[start:end]`
+    '''
+    left, right, _ = words[i]
+    before = max(start, words[i-1][1]) if i > 0 else start
+    after = min([end, words[i+1][0]]) if i+1 < len(words) else end
+    return left - spaces >= before and right + spaces <= after
+
+def climb(line, words, i, j, start, end, bound):
+    '''parses the span `line[start:end]`, whose words are `words[i:j]`,
+    with the operators from `bound` onwards.
+
+    `bound` is a (spacing, precedence) pair, ordered like the passes of `recursive_regex`:
+    from the most spaces down, then by precedence.
+    '''
+    spacing, precedence = bound
+
+    while True:
+        best = None
+
+        for k in range(i, j):
+            left, right, word = words[k]
+            if word not in climbing_table: continue
+
+            before = max(start, words[k-1][1]) if k > 0 else start
+            after = min([end, words[k+1][0]]) if k+1 < len(words) else end
+            spaces = min([left - before, after - right])
+
+            for p, operator in climbing_table[word]:
+                n = min([spaces, operator.spacing.max, spacing])
+                if n == spacing and p < precedence: n -= 1
+                if n < max(1, operator.spacing.min): continue
+                if best is None or (-n, p) < (-best[0], best[1]):
+                    best = (n, p, operator)
+
+        if best is None:
+            # nothing parsed
+            return Tree(line[start:end])
+
+        n, p, operator = best
+        if isa(operator, Ternop):
+            spans = climb_ternop(operator, n, words, i, j, start, end)
+        else:
+            spans = climb_binop(operator, n, words, i, j, start, end)
+
+        if spans:
+            break
+
+        # the loosest operator didn't parse, try the operators after it
+        spacing, precedence = n, p+1
+
+    operator = syntax.whiten(operator, n)
+    trees = []
+    for (is_operator, a, b, left, right) in spans:
+        word = line[left:right]
+        if is_operator or word in operator:
+            trees.append(Tree(Operator(word)))
+        else:
+            trees.append(climb(line, words, a, b, left, right, (n, p+1)))
+
+    return Tree((operator, trees))
+
+def climb_binop(operator, n, words, i, j, start, end):
+    '''splits a span like `parse_binop` would, with the `n`-spaced `operator`.
+
+    returns the spans of operators and non-blank operands, or None if nothing parsed.
+    '''
+    spans = []
+    last, first = start, i
+
+    for k in range(i, j):
+        left, right, word = words[k]
+        if word in operator and is_spaced(words, k, n, last, end):
+            spans.append((False, first, k, last, left - n))
+            spans.append((True, k, k+1, left - n, right + n))
+            last, first = right + n, k+1
+
+    spans.append((False, first, j, last, end))
+
+    # blank operands are words-less
+    spans = [span for span in spans if span[0] or span[1] < span[2]]
+
+    if len(spans) >= 3:
+        return spans
+
+def climb_ternop(operator, n, words, i, j, start, end):
+    '''splits a span like `parse_ternop` would, with the `n`-spaced `operator`:
+    the rightmost left symbol, that has a right symbol after it, then the rightmost right symbol.
+
+    returns the spans of all three operands and both operators, or None if nothing parsed.
+    '''
+    l, r = operator
+
+    rights = [k for k in range(i, j) if words[k][2] == r and is_spaced(words, k, n, start, end)]
+    if not rights:
+        return
+    y = rights[-1]
+
+    for x in reversed(range(i, y)):
+        if words[x][2] == l and is_spaced(words, x, n, start, end):
+            # a shared run of spaces must space both symbols
+            if words[x][1] + n <= words[y][0] - n:
+                break
+    else:
+        return
+
+    (l_left, l_right, _), (r_left, r_right, _) = words[x], words[y]
+    return [(False, i, x, start, l_left - n),
+            (True, x, x+1, l_left - n, l_right + n),
+            (False, x+1, y, l_right + n, r_left - n),
+            (True, y, y+1, r_left - n, r_right + n),
+            (False, y+1, j, r_right + n, end)]
+
 @typecheck
 def left_associate(tree: Tree) -> Tree:
     ''': n-ary tree => binary tree
     (only associates Binops, not Narops)
+
+    e.g. the chain `x -> y -> z` (one n-ary node) => `(x -> y) -> z`
+
+    bottom up, in one loop over the (flat) tree, and each chain in one loop over its links,
+    so it's linear and doesn't recurse (e.g. on chains with thousands of links).
+
+    >>> left_associate(Tree((Binop(' -> '), ['x', Operator(' -> '), 'y', Operator(' -> '), 'z']))).leaves()
+    [['x', ' -> ', 'y'], ' -> ', 'z']
     '''
-    value, trees = tree
+    tree = FlatTree(tree)
+    values = tree.values
+    associated = [None] * len(values)
 
-    if isinstance(value, Binop):
-        x, (op, _), y, *zs = trees
+    for i in tree.postorder_indices():
+        value = values[i]
+        trees = [associated[j] for j in tree.children(i)]
 
-        x = left_associate(x)
-        y = left_associate(y)
-        operator = copy(value)
-        operator = syntax.operators[op.strip()][0]
-        operands = [x, Tree(op), y]
-        left = Tree((operator, operands))
+        if isinstance(value, Binop):
+            x, (op, _), y, *zs = trees
+            left = Tree((syntax.operators[op.strip()][0], [x, Tree(op), y]))
+
+            for k in range(0, len(zs), 2):
+                (op, _), y = zs[k:k+2]
+                left = Tree((syntax.operators[op.strip()][0], [left, Tree(op), y]))
+
+            associated[i] = left
 
-        if not zs:
-            return left
         else:
-            trees = [left] + zs
-            return left_associate(Tree((value, trees)))
+            associated[i] = Tree((value, trees))
 
-    else:
-        trees = [left_associate(tree) for tree in trees]
-        return Tree((value, trees))
+    return associated[0]
 
 def AST(tree):
     '''the Abstract Syntax Tree
+    (a `FlatTree` from a `FlatTree`, e.g. for big notes)
+
+    the tree is filtered and mapped flat, so a long (i.e. deep) chain doesn't recurse.
     '''
     def is_operand(word): return not isinstance(word, Operator)
 
-    tree = left_associate(tree)
-    tree = tree.filter(f=is_operand, g=bool) # infix => prefix
-    tree = tree.map(f=lambda _: _.strip(), g=bool) # ' , ' => ','
-    return tree
+    flat = FlatTree(left_associate(tree.tree() if isinstance(tree, FlatTree) else tree))
+    flat = flat.filter(f=is_operand, g=bool) # infix => prefix
+    flat = flat.map(f=lambda _: _.strip(), g=bool) # ' , ' => ','
+    return flat if isinstance(tree, FlatTree) else flat.tree()
+
+#:: module | False | None
+compiled = None
+# the grammar compiled into a parser (see `codegen`), if it's built from this grammar (else False, and None until loaded).
+# it parses for the `recursive_regex` engine (which is still the interpreter, e.g. for `codegen.parity`).
 
+def load_compiled():
+    '''loads `compiled` on the first parse, not at import (as the compiled grammar imports `parsing`).
+    '''
+    global compiled
+    if compiled is None:
+        import codegen
+        compiled = codegen.load() or False
+        if compiled:
+            engines['recursive_regex'] = compiled.recursive_regex
+    return compiled
 
 if __name__ == "__main__":
     import doctest
@@ -11,6 +11,7 @@ POST /draw
 GET /query
 
 '''
+import hashlib
 import flask
 from flask import request
 
@@ -20,6 +21,9 @@ import parse
 import visualization
 import query
 import db
+import cache
+import tokens
+from Edge import Edge
 
 
 app = flask.Flask('Notes', static_folder='static', static_url_path='')
@@ -64,36 +68,78 @@ def API_draw_graph():
 
     '''
     text = request.get_json(force=True)['notes']
-    data = draw_graph(text)
 
     # None not a collection
     csrft = request.cookies.get('csrft')
     if csrft not in db.database.collection_names():
         csrft = random_string()
 
-    files = [(text, '(client)')]
-    notes = N.make_notes(files)
+    notes = parse_incrementally(text, csrft)
+    data = lines_to_graph([line for _, lines in notes for line in lines])
+
     with db.as_collection(csrft):
         db.collection().remove() # drops all documents, keeps collection
-        N.write_notes_to_database(notes)
+        for note, lines in notes:
+            N.write_and_print(note, lines=lines) # from the draw's parses, not parsed again
+        print()
         #TODO expire collection
 
     response = flask.jsonify(**data)
     response.set_cookie('csrft', csrft)
     return response
 
-def draw_graph(text):
-    return text_to_graph(text)
+def draw_graph(text, session=None):
+    return text_to_graph(text, session=session)
 
 def line_to_edges(parsed):
     edges = parsed.graph.edges
     for edge in edges:
-        edge.line = parsed.line
-        yield edge
+        # parses may be cached, so don't mutate their edges
+        yield Edge(edge.label, edge.nodes, line=parsed.line)
+
+#:: Cache {session: {hash: [Parsed]}}
+sessions = cache.Cache(size=100)
+# each session's notes (by content), as parsed on its last draw
+
+def note_hash(note):
+    return hashlib.sha1('\n'.join(note).encode('utf-8')).hexdigest()
+
+@strict
+def parse_incrementally(text, session):
+    '''parses only the notes added or changed since the session's last draw.
+
+    an unchanged note reuses its parses, moved to its new line numbers.
+    yields each note with its parsed lines.
+    '''
+    old = sessions.get(session) or {}
+    new = {}
+
+    notes = [(note, note_hash(note)) for note in N.read(text, file='(client)')]
+    tokens.ingest(line for note, key in notes if key not in old for line in note) # the new words, classified in one batch
+
+    with parse.session():
+        for note, key in notes:
+            parses = new.get(key) or old.get(key)
+
+            if parses:
+                lines = [cache.unpack(cache.pack(parsed), lineno=line.lineno, file=line.file)
+                         for parsed, line in zip(parses, note)]
+            else:
+                lines = parse.note(note, lines=True)
+
+            new[key] = [parsed.drop() for parsed in lines] # drawing only needs their graphs
+            yield note, lines
+
+    sessions.put(session, new)
 
-def text_to_graph(text):
-    lines = list(parse.parse(text))
+def text_to_graph(text, session=None):
+    if session is None:
+        lines = list(parse.parse(text))
+    else:
+        lines = [line for _, lines in parse_incrementally(text, session) for line in lines]
+    return lines_to_graph(lines)
 
+def lines_to_graph(lines):
     edges = [edge for line in lines for edge in line_to_edges(line)]
     nodes = remove_duplicates(node for line in lines for node in line.graph.nodes)
     graph = visualization.logic_graph_to_visual_graph(nodes, edges)
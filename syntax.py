@@ -25,6 +25,31 @@ symbol = {operator.means: operator for operator in precedence}
 # maps verbs (e.g. 'causes') back to symbols (e.g. '->')
 # verbs should be unique to operators
 
+#:: {(Op, int): Op}
+whitened = {}
+# the grammar table: each operator in `precedence`, whitened with some number of spaces.
+# each whitened operator compiles its `pattern` once, when it's first used.
+
+def whiten(operator, spaces):
+    '''looks up `operator.whiten(spaces)` in the grammar table, building it on a miss.
+
+    >>> operator = operators['->'][0]
+    >>> assert whiten(operator, 1) is whiten(operator, 1)
+    >>> assert whiten(operator, 1) == operator.whiten(1)
+    '''
+    key = (operator, spaces)
+    if key not in whitened:
+        whitened[key] = operator.whiten(spaces)
+    return whitened[key]
+
+#:: int
+precompiled_spaces = 8
+# the table is built (and its patterns compiled) up to this many spaces at import, and beyond it on demand.
+for _ in precedence:
+    for spaces in range(1 + precompiled_spaces):
+        if spaces in _.spacing:
+            whiten(_, spaces).pattern
+
 
 if __name__=='__main__':
     import doctest
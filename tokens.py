@@ -2,6 +2,7 @@ import re
 
 from util import *
 import config
+import cache
 
 
 class Words(tuple):
@@ -14,6 +15,8 @@ class Words(tuple):
         return ' '.join(string for (string,_,_) in self)
     def __repr__(self):
         return 'Words%r' % (tuple(self),)
+    def __getnewargs__(self):
+        return tuple(self)
 
 class Word(tuple):
     def __new__(cls, string, token='', match=None):
@@ -30,6 +33,13 @@ class Word(tuple):
             return 'Word(%r, %r)' % (string, token)
         else:
             return 'Word(%r, %r, %r)' % (string, token, match)
+    def __getnewargs__(self):
+        '''
+        >>> import pickle
+        >>> pickle.loads(pickle.dumps(Word('50%', 'percent', {'n': '50'})))
+        Word('50%', 'percent', {'n': '50'})
+        '''
+        return tuple(self)
 
 def match_token(word, regexes):
     '''tries to match word to any regex, in order.
@@ -57,8 +67,56 @@ def match_token(word, regexes):
             if match:
                 return match
 
-def match_word(word):
+def rename_groups(regex, prefix):
+    '''prefixes the named groups (and their backreferences) of a regex, to combine it with others.
+
+    >>> rename_groups('(?P<n>x)(?P=n)', '_0_')
+    '(?P<_0_n>x)(?P=_0_n)'
     '''
+    return re.sub(r'\(\?P([<=])(\w+)', lambda _: '(?P%s%s%s' % (_.group(1), prefix, _.group(2)), regex)
+
+def compile_tokens(tokens):
+    '''compiles a token table (like `config.tokens`) into one regex, that classifies a word in one match.
+
+    each inclusive regex becomes an alternative, in order (so the first match wins):
+    it matches if none of its token's earlier exclusive regexes are found in the word, and it is.
+    each alternative ends with an empty group named after it, so the match's `lastgroup` says which matched.
+
+    returns the regex, and a dict from each alternative's name to its token and its (renamed) groups.
+    (numbered backreferences aren't supported, since numbering changes when combined.)
+    '''
+    alternatives = []
+    names = {}
+
+    for token, regexes in tokens:
+        exclusions = []
+
+        for regex in regexes:
+            if isinstance(regex, dict):
+                exclusions.append(regex['not'])
+
+            else:
+                name = '_%d' % len(alternatives)
+                search = r'(?s:.*?)' # i.e. `re.search`, not `re.match`
+
+                nots = [rename_groups(_, '%s_not%d_' % (name, i)) for i, _ in enumerate(exclusions)]
+                nots = ''.join(r'(?!%s(?:%s))' % (search, _) for _ in nots)
+
+                groups = re.compile(regex, re.UNICODE|re.VERBOSE).groupindex
+                regex = rename_groups(regex, name + '_')
+
+                alternative = r'\A%s(?=%s(?:%s))(?P<%s>)' % (nots, search, regex, name)
+                alternatives.append(alternative)
+                names[name] = (token, {group: name + '_' + group for group in groups})
+
+    regex = '|'.join('(?:%s)' % _ for _ in alternatives)
+    return re.compile(regex, re.UNICODE|re.VERBOSE), names
+
+matcher, matches = compile_tokens(config.tokens)
+
+def match_word(word):
+    '''classifies a word by the first token that matches it (see `compile_tokens`).
+
     >>> match_word('looks/sounds/feels')
     Word('looks/sounds/feels', 'word')
 
@@ -82,8 +140,20 @@ def match_word(word):
 
     >>> match_word('1+2')
     Word('1+2')
+
+    >>> words = ['5-HT', '1+2', '50%', 'azarask.in/', 'α-lipoic', 'acid']
+    >>> assert [match_word(_) for _ in words] == [match_tokens(_) for _ in words]
     '''
+    match = matcher.match(word)
+    if match:
+        token, groups = matches[match.lastgroup]
+        groups = {group: match.group(name) for group, name in groups.items()}
+        return Word(word, token, groups)
+    return Word(word)
 
+def match_tokens(word):
+    '''like `match_word`, trying each regex of each token in turn.
+    '''
     for token, regexes in config.tokens:
         match = match_token(word, regexes)
         if match:
@@ -91,13 +161,46 @@ def match_word(word):
             return word
     return Word(word)
 
+vocabulary = cache.Cache(size=config.vocabulary['size'], path=config.vocabulary['path'], version=config.tokens_hash)
+# each word seen, classified (configured in `vocabulary.yaml`).
+# most occurrences of a word are of a word seen before, so they're looked up, not matched.
+
+def lookup(word: str) -> Word:
+    '''`match_word`, through the vocabulary.
+
+    >>> lookup('50%') == match_word('50%')
+    True
+    '''
+    classified = vocabulary.get(word)
+    if classified is None:
+        classified = match_word(word)
+        vocabulary.put(word, classified)
+    return classified
+
+def ingest(lines: [str]) -> [Words]:
+    '''tokenizes many lines (e.g. a corpus) at once:
+    collects their distinct words, classifies the new ones in one batch, then tokenizes each line by lookup.
+
+    >>> ingest(['1+2 50%', '50%'])
+    [Words(Word('1+2'), Word('50%', 'percent', {'n': '50'})), Words(Word('50%', 'percent', {'n': '50'}),)]
+    '''
+    lines = [line.split() for line in lines]
+    words = {word: vocabulary.get(word) for line in lines for word in line}
+
+    new = [word for word, classified in words.items() if classified is None]
+    for word in new:
+        words[word] = match_word(word)
+        vocabulary.put(word, words[word])
+
+    return [Words(*(words[word] for word in line)) for line in lines]
+
 @typecheck
 def tokenize(line: str) -> Words:
     '''
     if no token matches the word, return just the word.
     if the word matches some token, return a Word, with the first token that matches.
     '''
-    words = [match_word(word) for word in line.split()]
+    words = [lookup(word) for word in line.split()]
     return Words(*words)
 
 @typecheck
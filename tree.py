@@ -1,5 +1,6 @@
 from multimethod import multimethod
 from collections import OrderedDict
+from contextlib import contextmanager
 
 
 def strict(f):
@@ -16,7 +17,7 @@ class Tree(tuple):
             tree = (tree, ()) # leaf => tree
 
         value, trees = tree
-        trees = tuple(Tree(tree) for tree in trees)
+        trees = tuple(tree if isinstance(tree, Tree) else Tree(tree) for tree in trees) # a Tree's subtrees are already Trees
 
         return super().__new__(cls, (value, trees))
 
@@ -37,16 +38,9 @@ class Tree(tuple):
         else:
             return (value, [tree.repr() for tree in trees])
 
-    @strict
     def preorder(self):
-        '''pre-order traversal'''
-        value, trees = self
-
-        yield value
-
-        for tree in trees:
-            for value in tree.preorder():
-                yield value
+        '''pre-order traversal (in a loop, see `FlatTree`)'''
+        return FlatTree(self).preorder()
 
     @strict
     def inorder(self):
@@ -74,10 +68,8 @@ class Tree(tuple):
         return not trees
 
     def leaves(self):
-        '''return just the leaves, with the tree's structure'''
-        value, trees = self
-        lists = [Tree((v, t)).leaves() if t else v for (v, t) in trees]
-        return lists
+        '''return just the leaves, with the tree's structure (in a loop, see `FlatTree`)'''
+        return FlatTree(self).leaves()
 
     def map(self: 'Tree α', f: 'α -> β', g=lambda _: True) -> 'Tree β':
         value, trees = self
@@ -96,12 +88,9 @@ class Tree(tuple):
             return Tree((value, [tree.tmap(f) for tree in trees]))
 
     def fold(self: 'Tree α', f: 'α, [α] -> α') -> 'α':
-        value, trees = self
-
-        values = tuple(tree.fold(f) for tree in trees)
-        value = f(value, values)
-
-        return value
+        '''bottom up, in a loop (see `FlatTree`), so deep trees (e.g. long chains) don't recurse.
+        '''
+        return FlatTree(self).fold(f)
 
     def filter(self: 'Tree α', f: 'α -> bool', g=lambda _: False) -> 'Tree α':
         '''skips root -> always returns Tree
@@ -122,6 +111,299 @@ class Tree(tuple):
             return Tree(y)
         return lifted
 
+class FlatTree:
+    '''
+    Tree α, as parallel arrays, in pre-order:
+
+        values  ~ the value of each node
+        parents ~ the index of each node's parent (-1 for the root)
+        ends    ~ the index just past each node's subtree
+                  (i.e. its children are at i+1, then at the end of each child, until ends[i])
+
+    the same operations as `Tree`, each a loop over the arrays,
+    rather than a recursion that allocates a new tuple per node.
+
+    >>> t = FlatTree((':', [(',', ['x', 'y']), 'z']))
+    >>> t.values, t.parents, t.ends
+    ([':', ',', 'x', 'y', 'z'], [-1, 0, 1, 1, 0], [5, 4, 3, 4, 5])
+    >>> t.tree() == Tree((':', [(',', ['x', 'y']), 'z']))
+    True
+    '''
+    __slots__ = ('values', 'parents', 'ends')
+
+    def __init__(self, tree):
+        '''from a `Tree` (or anything `Tree` takes, e.g. a leaf, or lists for children).
+        '''
+        values, parents = [], []
+        stack = [(tree, -1)]
+        while stack:
+            tree, parent = stack.pop()
+            if not isinstance(tree, tuple):
+                tree = (tree, ()) # leaf => tree
+            value, trees = tree
+            values.append(value)
+            parents.append(parent)
+            i = len(values) - 1
+            stack.extend((tree, i) for tree in reversed(trees))
+
+        self.values = values
+        self.parents = parents
+        self.ends = ends_of(parents)
+
+    @classmethod
+    def arrays(cls, values: list, parents: list) -> 'FlatTree':
+        self = cls.__new__(cls)
+        self.values = values
+        self.parents = parents
+        self.ends = ends_of(parents)
+        return self
+
+    def tree(self) -> Tree:
+        '''the nested `Tree`, built bottom up (its subtrees shared with other trees, in a `sharing` session).
+        '''
+        values, parents = self.values, self.parents
+        new = Tree.__new__ if shared is None else shared
+        children = [[] for _ in values]
+        for i in reversed(range(len(values))):
+            trees = children[i]
+            trees.reverse()
+            tree = new(Tree, (values[i], trees))
+            if parents[i] < 0:
+                return tree
+            children[parents[i]].append(tree)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __eq__(self, other):
+        return isinstance(other, FlatTree) and (self.values, self.parents) == (other.values, other.parents)
+
+    def __str__(self):
+        return '%s' % (self.tree().repr(),)
+
+    def __repr__(self):
+        return 'FlatTree(%r)' % (self.tree().repr(),)
+
+    def children(self, i: int) -> [int]:
+        ends = self.ends
+        j = i + 1
+        while j < ends[i]:
+            yield j
+            j = ends[j]
+
+    def is_leaf(self, i=0):
+        return self.ends[i] == i + 1
+
+    def postorder_indices(self) -> [int]:
+        '''
+        >>> FlatTree((':', [(',', ['x', 'y']), 'z'])).postorder_indices()
+        [2, 3, 1, 4, 0]
+        '''
+        ends = self.ends
+        order, stack = [], []
+        for i in range(len(ends)):
+            while stack and ends[stack[-1]] <= i:
+                order.append(stack.pop())
+            stack.append(i)
+        order.extend(reversed(stack))
+        return order
+
+    def preorder(self):
+        '''pre-order traversal'''
+        return list(self.values)
+
+    def leaves(self):
+        '''return just the leaves, with the tree's structure
+
+        >>> _ = None
+        >>> FlatTree((_, ['a', (_, ['b', 'c']), 'd'])).leaves()
+        ['a', ['b', 'c'], 'd']
+        '''
+        values, parents, ends = self.values, self.parents, self.ends
+        lists = [[]] + [None] * (len(values) - 1)
+        for i in range(1, len(values)):
+            if ends[i] > i + 1:
+                lists[i] = []
+                lists[parents[i]].append(lists[i])
+            else:
+                lists[parents[i]].append(values[i])
+        return lists[0]
+
+    def map(self, f: 'α -> β', g=lambda _: True) -> 'FlatTree':
+        '''like `Tree.map`, but `g` is given the (mapped) values of the node's children (not its subtrees).
+
+        >>> FlatTree((' + ', [' 1 ', ' 2 '])).map(str.strip, g=bool)
+        FlatTree(('+', [' 1 ', ' 2 ']))
+        '''
+        values = list(self.values)
+        for i in self.postorder_indices():
+            if g(tuple(values[j] for j in self.children(i))):
+                values[i] = f(values[i])
+        return FlatTree.arrays(values, list(self.parents))
+
+    def tmap(self, f: 'Tree α -> α | Tree α') -> 'FlatTree':
+        '''can 'grow' a tree by turning leaves into branches.
+        `f` is given each leaf as a `Tree`, like `Tree.tmap`.
+        '''
+        old_values, old_parents, ends = self.values, self.parents, self.ends
+        values, parents = [], []
+        index = [-1] * len(old_values)
+        for i, value in enumerate(old_values):
+            parent = index[old_parents[i]] if old_parents[i] >= 0 else -1
+            if ends[i] == i + 1:
+                grown = FlatTree(f(Tree((value, ()))))
+                offset = len(values)
+                values.extend(grown.values)
+                parents.extend(parent if p < 0 else p + offset for p in grown.parents)
+            else:
+                index[i] = len(values)
+                values.append(value)
+                parents.append(parent)
+        return FlatTree.arrays(values, parents)
+
+    def fold(self, f: 'α, [α] -> α') -> 'α':
+        '''like `Tree.fold`, calling `f` in the same (post) order.
+        '''
+        values = self.values
+        folded = [None] * len(values)
+        for i in self.postorder_indices():
+            folded[i] = f(values[i], tuple(folded[j] for j in self.children(i)))
+        return folded[0]
+
+    def filter(self, f: 'α -> bool', g=lambda _: False) -> 'FlatTree':
+        '''like `Tree.filter` (which skips the root, and checks `g` only on the root's children),
+        but `g` is given the values of the child's children (not its subtrees).
+
+        >>> FlatTree((True, [(False, [1, 2]), 3])).filter(bool)
+        FlatTree((True, [3]))
+        '''
+        values, parents, ends = self.values, self.parents, self.ends
+        kept = [0]
+        i = 1
+        while i < len(values):
+            if (parents[i] == 0 and g(tuple(values[j] for j in self.children(i)))) or f(values[i]):
+                kept.append(i)
+                i += 1
+            else:
+                i = ends[i] # skip the subtree
+
+        index = {old: new for new, old in enumerate(kept)}
+        return FlatTree.arrays([values[i] for i in kept],
+                               [-1] + [index[parents[i]] for i in kept[1:]])
+
+    lift = Tree.lift
+
+class Share:
+    '''a hash-consing table: one (immutable) `Tree` per structurally equal subtree.
+
+    a subtree is looked up by its value and the identities of its (already shared) children,
+    so it's hashed without traversing it.
+
+    >>> share = Share()
+    >>> t = share(Tree, (',', ['x', 'x']))
+    >>> t == Tree((',', ['x', 'x'])) and t[1][0] is t[1][1]
+    True
+    >>> share(Tree, (':', [t, 'x']))[1][1] is t[1][0]
+    True
+    >>> len(share)
+    3
+    '''
+    __slots__ = ('trees', 'folds')
+
+    def __init__(self):
+        self.trees = {}
+        self.folds = {}
+
+    def __call__(self, cls, tree) -> Tree:
+        if not isinstance(tree, tuple):
+            tree = (tree, ()) # leaf => tree
+        value, trees = tree
+        trees = tuple(tree if isinstance(tree, Tree) else self(Tree, tree) for tree in trees) # held by the shared tree, so their ids aren't reused
+        key = (type(value), value, tuple(map(id, trees))) # the type first, as an `Op` can't be compared to a `str`
+        shared = self.trees.get(key)
+        if shared is None:
+            shared = self.trees[key] = Tree.__new__(cls, (value, trees))
+        return shared
+
+    def __len__(self):
+        return len(self.trees)
+
+    def fold(self, tree: Tree, f: 'α, [α] -> α', seen: 'α, [α], α -> None' = None) -> 'α':
+        '''like `Tree.fold`, but `f` is called once per subtree (by identity) per session,
+        e.g. once for all the lines that share it (so it must be pure).
+        `seen` is called on every node (in the same order), with its folded value.
+
+        >>> share = Share()
+        >>> calls = []
+        >>> def f(value, folded): calls.append(value); return value
+        >>> share.fold(share(Tree, ('+', ['x', 'y'])), f)
+        '+'
+        >>> share.fold(share(Tree, ('-', [('+', ['x', 'y']), 'z'])), f)
+        '-'
+        >>> calls
+        ['x', 'y', '+', 'z', '-']
+        '''
+        folds = self.folds.setdefault(f, {}) #:: {id: (Tree, α)}, holding each tree, so its id isn't reused
+        values = []
+        stack = [(tree, False)]
+        while stack:
+            tree, is_visited = stack.pop()
+            value, trees = tree
+            if not is_visited:
+                if seen is None and id(tree) in folds:
+                    values.append(folds[id(tree)][1]) # skips the subtree
+                else:
+                    stack.append((tree, True))
+                    stack.extend((tree, False) for tree in reversed(trees))
+                continue
+
+            n = len(values) - len(trees)
+            folded = tuple(values[n:])
+            del values[n:]
+            if id(tree) in folds:
+                result = folds[id(tree)][1]
+            else:
+                result = f(value, folded)
+                folds[id(tree)] = (tree, result)
+            if seen is not None:
+                seen(value, folded, result)
+            values.append(result)
+        return values[-1]
+
+#:: Share | None
+shared = None
+# the table of the current `sharing` session
+
+@contextmanager
+def sharing(share=True):
+    '''a session (e.g. parsing a corpus), whose trees built by `FlatTree.tree` share their equal subtrees.
+
+    the table holds its trees (keyed by the `id`s of their children, which must outlive it),
+    and is dropped when the (outermost) session ends, after which its trees are collected with the last of their parses.
+    '''
+    global shared
+    if not share or shared is not None:
+        yield shared
+        return
+    shared = Share()
+    try:
+        yield shared
+    finally:
+        shared = None
+
+def ends_of(parents: [int]) -> [int]:
+    '''the end of each subtree, from the parents (in pre-order).
+
+    >>> ends_of([-1, 0, 1, 1, 0])
+    [5, 4, 3, 4, 5]
+    '''
+    ends = list(range(1, len(parents) + 1))
+    for i in reversed(range(len(parents))):
+        parent = parents[i]
+        if parent >= 0 and ends[i] > ends[parent]:
+            ends[parent] = ends[i]
+    return ends
+
 def memoize(f, cache=None):
     if cache is None: cache = {}
 
@@ -7,6 +7,8 @@ import pprint
 import itertools
 from itertools import filterfalse
 import random
+import os
+import yaml
 
 from recipes import OrderedSet
 from printing import *
@@ -59,8 +61,7 @@ def flatten(l):
     >>> flatten([[1],[[2,[3]],[4]],5])
     [1,2,3,4,5]
     '''
-    if not l: return []
-    return functools.reduce(lambda xs,ys: xs+ys, map(flatten, l))
+    return [y for x in l for y in flatten(x)]
 
 def stagger(xs, ys):
     """
@@ -89,16 +90,44 @@ def dict_merge(x:dict, y:dict):
     '''
     return dict(list(x.items()) + list(y.items()))
 
+mode = os.environ.get('NOTES_MODE') or yaml.load(open('mode.yaml'))['mode']
+# chosen once, at startup (see `mode.yaml`)
+
 @decorator
 def typecheck(f):
+    '''checks the (non-string) annotated types of the arguments and of the return value.
+
+    in "production" mode, installs `f` itself.
+    in "development" mode, the argspec and the types are read once, when `f` is decorated.
+
+    >>> @typecheck
+    ... def f(x: int, y: 'unchecked' = None) -> int:
+    ...     return x
+    >>> f(1)
+    1
+    >>> f('1')
+    Traceback (most recent call last):
+    ...
+    TypeError: in "f(... x:<class 'int'> ...)", x was 1
+    '''
+    if mode == 'production':
+        return f
+
+    types = {var: typ for var, typ in f.__annotations__.items() if not isinstance(typ, str)}
+    positionals = inspect.getfullargspec(f).args
+    checks = [(positionals.index(var) if var in positionals else None, var, typ)
+              for var, typ in types.items() if var != 'return']
+    has_return_type = 'return' in types
+    return_type = types.get('return')
 
     def typechecked(*args, **kwargs):
-        types = f.__annotations__
-        types = {var: typ for var, typ in types.items() if not isinstance(typ, str)}
-        positionals = inspect.getfullargspec(f).args
-        values = dict_merge(kwargs, dict(zip(positionals, args)))
-        vars = set(types) & set(values)
-        for var, val, typ in [(x, values[x], types[x]) for x in vars]:
+        for i, var, typ in checks:
+            if i is not None and i < len(args):
+                val = args[i]
+            elif var in kwargs:
+                val = kwargs[var]
+            else:
+                continue
             if not isinstance(val, typ):
                 msg = 'in "{f}(... {var}:{typ} ...)", {var} was {val}'
                 msg = msg.format(**{'f': f.__name__, 'var':var, 'val':val, 'typ':typ})
@@ -106,8 +135,7 @@ def typecheck(f):
 
         return_val = f(*args, **kwargs)
 
-        if 'return' in types:
-            return_type = types['return']
+        if has_return_type:
             if not isinstance(return_val, return_type):
                 msg = 'in "{f}(...) -> {typ}", return value was "{val}"'
                 msg = msg.format(**{'f': f.__name__, 'val':return_val, 'typ':return_type})
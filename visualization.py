@@ -29,10 +29,12 @@ def cliquify(arc: Edge) -> [Edge]:
             yield edge
 
 def logic_edge_to_visual_link(nodes, edge):
+    '''`nodes` maps each node to its index
+    '''
     V,S,O = edge
-    link = {'source': nodes.index(S),
+    link = {'source': nodes[S],
             'name': V,
-            'target': nodes.index(O),
+            'target': nodes[O],
             'lineno': edge.line.lineno,
             'show': edge.format()}
     return link
@@ -54,7 +56,10 @@ def logic_graph_to_visual_graph(nodes, edges) -> json:
     '''
 
     edges = [edge for arc in edges for edge in cliquify(arc)]
-    links = [logic_edge_to_visual_link(nodes, edge) for edge in edges]
+    index = {}
+    for i, node in enumerate(nodes):
+        index.setdefault(node, i)
+    links = [logic_edge_to_visual_link(index, edge) for edge in edges]
     nodes = [{'name': node} for node in nodes]
     graph = {'nodes': nodes, 'links': links}
 